@@ -0,0 +1,105 @@
+import functools
+import glob
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageFont
+
+from astrbot.api import logger
+
+# 处理后的 Logo：(源文件, mtime, 容差, 目标高度, 背景色) -> 图片
+_LogoKey = Tuple[str, int, int, int, Tuple[int, int, int]]
+_logo_cache: Dict[_LogoKey, Image.Image] = {}
+_logo_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=32)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """按 (字体文件, 字号) 在进程内共享字体对象"""
+    return ImageFont.truetype(path, size)
+
+
+def _logo_cache_path(key: _LogoKey) -> str:
+    path, mtime, tolerance, height, bg_color = key
+    stem, _ = os.path.splitext(path)
+    color = "".join(f"{c:02x}" for c in bg_color)
+    return f"{stem}.cache-{mtime}-{tolerance}-{height}-{color}.png"
+
+
+def _process_logo(
+    path: str,
+    target_height: int,
+    bg_color: Tuple[int, int, int],
+    tolerance: int,
+) -> Image.Image:
+    """去除接近背景色的像素并缩放到目标高度"""
+    logo_img = Image.open(path).convert("RGBA")
+    img_data = np.array(logo_img)
+    r, g, b, a = img_data.T
+    white_areas = (
+        (r >= bg_color[0] - tolerance)
+        & (g >= bg_color[1] - tolerance)
+        & (b >= bg_color[2] - tolerance)
+        & (a > 128)
+    )
+    img_data[..., -1][white_areas.T] = 0
+    logo_transparent = Image.fromarray(img_data)
+    ow, oh = logo_transparent.size
+    new_w = int(target_height * ow / oh)
+    return logo_transparent.resize((new_w, target_height), Image.Resampling.LANCZOS)
+
+
+def _write_logo_cache(logo: Image.Image, key: _LogoKey) -> None:
+    cache_path = _logo_cache_path(key)
+    path, mtime, tolerance, _, bg_color = key
+    stem, _ = os.path.splitext(path)
+    color = "".join(f"{c:02x}" for c in bg_color)
+    # 源文件或去背景参数变化后，旧的缓存文件不再有用；同一组参数下不同高度
+    # （不同缩放倍数）的缓存各保留一份，互不删除
+    current_prefix = f"{stem}.cache-{mtime}-{tolerance}-"
+    current_suffix = f"-{color}.png"
+    for stale in glob.glob(glob.escape(stem) + ".cache-*.png"):
+        if stale.startswith(current_prefix) and stale.endswith(current_suffix):
+            continue
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+    tmp_path = cache_path + ".tmp"
+    try:
+        logo.save(tmp_path, format="PNG")
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # 插件目录可能只读，此时仅使用内存缓存
+        logger.debug(f"写入 Logo 缓存失败: {e}")
+
+
+def load_transparent_logo(
+    path: str,
+    target_height: int,
+    bg_color: Tuple[int, int, int],
+    tolerance: int,
+) -> Optional[Image.Image]:
+    """获取去背景并缩放后的 Logo，依次查找内存缓存、磁盘缓存，最后才重新处理"""
+    key: _LogoKey = (
+        path,
+        os.stat(path).st_mtime_ns,
+        tolerance,
+        target_height,
+        tuple(bg_color),
+    )
+    with _logo_lock:
+        logo = _logo_cache.get(key)
+        if logo is not None:
+            return logo
+        cache_path = _logo_cache_path(key)
+        try:
+            with Image.open(cache_path) as cached:
+                logo = cached.convert("RGBA")
+        except (OSError, ValueError):
+            logo = _process_logo(path, target_height, bg_color, tolerance)
+            _write_logo_cache(logo, key)
+        _logo_cache[key] = logo
+        return logo
@@ -0,0 +1,248 @@
+"""帮助图渲染基准测试
+
+不依赖 AstrBot 运行环境和网络，用合成的插件命令数据驱动
+AstrBotHelpDrawer.draw_help_image，输出各阶段耗时、峰值内存与图片体积（JSON）。
+
+用法（在插件目录下执行）::
+
+    python benchmark.py                              # 默认全部用例
+    python benchmark.py --plugins 10,100 --desc cjk  # 只跑部分用例
+    python benchmark.py --output bench_output.txt    # 保存结果
+    python benchmark.py --baseline bench_output.txt  # 与上次结果对比
+
+每个用例在独立的子进程中运行，首次渲染记为 cold（缓存全空），
+其余轮次取中位数记为 warm（图块、文字等缓存已就绪）。
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any, Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ("parse", "layout", "gradient", "cards", "compose", "encode", "total")
+
+SHORT_DESCS = ["查看天气", "随机图片", "签到", "今日运势", "help", "开关功能"]
+LONG_DESCS = [
+    "Fetch the latest weather forecast for the given city and reply with a summary",
+    "Generate a random picture from the configured gallery, optionally filtered by tag",
+    "Toggle the automatic reply feature for the current group or private session",
+]
+CJK_DESCS = [
+    "根据输入的城市名称查询未来三天的天气预报，并以图片形式返回结果（支持拼音）",
+    "从图库中随机抽取一张图片发送，可以通过标签筛选，例如：/图片 风景",
+    "开启或关闭本群的自动回复功能，仅管理员可用，设置会在重启后保留。",
+]
+DESC_KINDS = {"short": SHORT_DESCS, "long": LONG_DESCS, "cjk": CJK_DESCS}
+
+
+def _install_astrbot_stub() -> None:
+    """draw.py 只用到 astrbot 的 logger 和配置类型，未安装 AstrBot 时用最小替身代替"""
+    try:
+        importlib.import_module("astrbot.api")
+        return
+    except ImportError:
+        pass
+    api = types.ModuleType("astrbot.api")
+    api.logger = logging.getLogger("astrbot_plugin_help.benchmark")
+    config_mod = types.ModuleType("astrbot.core.config.astrbot_config")
+    config_mod.AstrBotConfig = dict
+    for name in ("astrbot", "astrbot.core", "astrbot.core.config"):
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules["astrbot.api"] = api
+    sys.modules["astrbot.core.config.astrbot_config"] = config_mod
+
+
+def _import_module(name: str):
+    """以包的形式导入插件模块，使其中的相对导入可用"""
+    _install_astrbot_stub()
+    if os.path.dirname(PLUGIN_DIR) not in sys.path:
+        sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    package = os.path.basename(PLUGIN_DIR)
+    return importlib.import_module(f"{package}.{name}")
+
+
+def make_plugin_commands(
+    plugin_count: int, desc_kind: str, seed: int = 0
+) -> Dict[str, List[Any]]:
+    """生成合成的 {plugin_name: [CommandRecord]} 数据，同样的参数结果一致"""
+    record = _import_module("command_model").CommandRecord
+    rng = random.Random(seed)
+    descs = DESC_KINDS[desc_kind]
+    plugin_commands = {}
+    for i in range(plugin_count):
+        name = f"astrbot_plugin_bench_{i}"
+        count = rng.choice([1, 1, 2, 3, 4, 6, 9])
+        plugin_commands[name] = [
+            record(f"/cmd{i}_{j}", rng.choice(descs), name) for j in range(count)
+        ]
+    return plugin_commands
+
+
+def make_config(custom_cmds: bool, image_format: str) -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        show_builtin_cmds=True,
+        custom_cmds=[f"/custom{i} : 自定义命令 {i}" for i in range(8)]
+        if custom_cmds
+        else [],
+        plugin_blacklist=[],
+        version="bench",
+        image_format=image_format,
+    )
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """在当前进程中运行单个用例"""
+    drawer_cls = _import_module("draw").AstrBotHelpDrawer
+    plugin_commands = make_plugin_commands(case["plugins"], case["desc"])
+    config = make_config(case["custom_cmds"], case["format"])
+
+    tracemalloc.start()
+    init_start = time.perf_counter()
+    drawer = drawer_cls(config)
+    init_ms = (time.perf_counter() - init_start) * 1000
+
+    runs = []
+    for _ in range(max(2, case["repeat"])):
+        start = time.perf_counter()
+        data = drawer.draw_help_image(plugin_commands)
+        wall_ms = (time.perf_counter() - start) * 1000
+        stats = dict(drawer.last_render_stats)
+        stats["wall_ms"] = wall_ms
+        stats["bytes"] = len(data)
+        runs.append(stats)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    def summarize(samples: List[Dict[str, Any]]) -> Dict[str, float]:
+        keys = [f"{stage}_ms" for stage in STAGES] + ["wall_ms"]
+        return {
+            key: round(statistics.median(s.get(key, 0.0) for s in samples), 3)
+            for key in keys
+        }
+
+    cold, warm = runs[0], runs[1:]
+    return {
+        "case": case,
+        "init_ms": round(init_ms, 3),
+        "cold": summarize([cold]),
+        "warm": summarize(warm),
+        "width": cold["width"],
+        "height": cold["height"],
+        "bytes": cold["bytes"],
+        "commands": sum(len(cmds) for cmds in plugin_commands.values()),
+        # Pillow 的像素缓冲区不经过 Python 分配器，因此同时给出进程 RSS 峰值
+        "peak_python_kb": python_peak // 1024,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if resource
+        else None,
+    }
+
+
+def run_isolated(case: Dict[str, Any]) -> Dict[str, Any]:
+    """在独立子进程中运行用例，保证缓存全空且内存峰值互不影响"""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """为每个用例附上与基线结果的对比（比值 < 1 表示更快/更小）"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            json.dumps(r["case"], sort_keys=True): r for r in json.load(f)["results"]
+        }
+    for result in results:
+        old = baseline.get(json.dumps(result["case"], sort_keys=True))
+        if old is None:
+            continue
+        result["vs_baseline"] = {
+            "cold_wall": _ratio(result["cold"]["wall_ms"], old["cold"]["wall_ms"]),
+            "warm_wall": _ratio(result["warm"]["wall_ms"], old["warm"]["wall_ms"]),
+            "bytes": _ratio(result["bytes"], old["bytes"]),
+            "peak_rss": _ratio(result["peak_rss_kb"] or 0, old["peak_rss_kb"] or 0),
+        }
+
+
+def _ratio(new: float, old: float) -> float | None:
+    return round(new / old, 3) if old else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plugins", default="10,100,1000", help="插件数量，逗号分隔")
+    parser.add_argument("--desc", default="short,long,cjk", help="描述类型，逗号分隔")
+    parser.add_argument(
+        "--custom", default="off,on", help="是否带 custom_cmds：off,on 或其一"
+    )
+    parser.add_argument("--format", default="png", help="输出格式，同 image_format")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的渲染轮数")
+    parser.add_argument("--output", help="把 JSON 结果写入该文件")
+    parser.add_argument("--baseline", help="与该文件中的历史结果对比")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case)), ensure_ascii=False))
+        return
+
+    cases = [
+        {
+            "plugins": int(plugins),
+            "desc": desc,
+            "custom_cmds": custom == "on",
+            "format": args.format,
+            "repeat": args.repeat,
+        }
+        for plugins in args.plugins.split(",")
+        for desc in args.desc.split(",")
+        for custom in args.custom.split(",")
+    ]
+    results = []
+    for case in cases:
+        result = run_isolated(case)
+        results.append(result)
+        print(
+            f"plugins={case['plugins']:<5} desc={case['desc']:<5} "
+            f"custom={'on ' if case['custom_cmds'] else 'off'} "
+            f"cold={result['cold']['wall_ms']:>9.1f} ms "
+            f"warm={result['warm']['wall_ms']:>9.1f} ms "
+            f"{result['width']}x{result['height']} {result['bytes'] / 1024:.0f} KB",
+            file=sys.stderr,
+        )
+    if args.baseline:
+        compare(results, args.baseline)
+
+    report = json.dumps(
+        {"python": sys.version.split()[0], "results": results},
+        ensure_ascii=False,
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import collections
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from astrbot.api import logger
+
+from .command_model import PluginCommands
+
+# 绘图输出的版本号：绘制结果有任何变化（排版、换行、配色等）时加一，
+# 使升级插件后磁盘缓存中的旧图片自动失效
+RENDER_VERSION = 1
+
+# 影响帮助图输出的配置项，参与指纹计算
+FINGERPRINT_CONFIG_KEYS = (
+    "show_builtin_cmds",
+    "custom_cmds",
+    "plugin_blacklist",
+    "version",
+    "image_format",
+    "png_compress_level",
+    "jpeg_quality",
+    "render_scale",
+    "layout_mode",
+    "card_columns",
+    "page_size",
+)
+
+
+def make_fingerprint(
+    plugin_commands: PluginCommands, config: Any, variant: str = ""
+) -> str:
+    """根据命令字典与相关配置计算内容指纹，作为缓存键
+
+    variant 用于区分同一份命令的不同输出（如分页、按插件筛选）。
+    """
+    payload = {
+        "render_version": RENDER_VERSION,
+        "variant": variant,
+        # 插件顺序会影响排序结果，这里保留原始顺序而不是排序
+        "commands": list(plugin_commands.items()),
+        "config": {key: getattr(config, key, None) for key in FINGERPRINT_CONFIG_KEYS},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class HelpImageCache:
+    """帮助图片缓存：内存 LRU + 可选的磁盘层"""
+
+    DISK_SUFFIX = ".bin"
+
+    def __init__(
+        self,
+        max_items: int = 8,
+        disk_dir: Optional[str] = None,
+        max_disk_items: int = 32,
+    ) -> None:
+        self.max_items = max(1, max_items)
+        self.disk_dir = disk_dir
+        self.max_disk_items = max(1, max_disk_items)
+        self._memory: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"创建帮助图缓存目录失败，已禁用磁盘缓存: {e}")
+                self.disk_dir = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            return data
+        data = self._read_disk(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        self._write_disk(key, data)
+
+    # ---------------- 内存层 ----------------
+    def _remember(self, key: str, data: bytes) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    # ---------------- 磁盘层 ----------------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + self.DISK_SUFFIX)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 刷新修改时间，供淘汰时判断新旧
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"读取帮助图磁盘缓存失败: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入帮助图磁盘缓存失败: {e}")
+            return
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.disk_dir)
+                if entry.is_file() and entry.name.endswith(self.DISK_SUFFIX)
+            ]
+        except OSError:
+            return
+        if len(entries) <= self.max_disk_items:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_disk_items]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class HelpImageFileStore:
+    """把帮助图按内容哈希落盘，发送时只传文件路径
+
+    同一张图只写一次；文件名由内容决定，适配器可以据此复用上传缓存。
+    超过 max_age 秒未被使用或总大小超过 max_bytes 时，从最久未使用的文件开始清理。
+    """
+
+    EXTENSIONS = {"png": "png", "png_palette": "png", "webp": "webp", "jpeg": "jpg"}
+
+    def __init__(
+        self, directory: str, max_bytes: int = 64 << 20, max_age: float = 3 * 86400
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max(1, max_bytes)
+        self.max_age = max(60.0, max_age)
+        # 缓存键 -> 文件路径，命中时无需再计算哈希
+        self._paths: Dict[str, str] = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key: str, data: bytes, image_format: str = "png") -> str:
+        """返回图片对应的文件路径，文件不存在时写入；失败时抛出 OSError"""
+        path = self._paths.get(key)
+        if path is not None and os.path.exists(path):
+            # 刷新修改时间，供清理时判断是否仍在使用
+            os.utime(path)
+            return path
+        ext = self.EXTENSIONS.get(image_format, "png")
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        path = os.path.join(self.directory, f"{digest}.{ext}")
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.cleanup(keep=path)
+        self._paths[key] = path
+        return path
+
+    def cleanup(self, keep: Optional[str] = None) -> None:
+        """按最久未使用的顺序删除过期文件，直到总大小不超过上限"""
+        try:
+            entries = [
+                (entry.path, entry.stat())
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ]
+        except OSError:
+            return
+        entries.sort(key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        now = time.time()
+        for path, stat in entries:
+            if path == keep:
+                continue
+            if total <= self.max_bytes and now - stat.st_mtime <= self.max_age:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+        self._paths = {k: p for k, p in self._paths.items() if os.path.exists(p)}
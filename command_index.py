@@ -0,0 +1,87 @@
+import collections
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.permission import PermissionType, PermissionTypeFilter
+from astrbot.core.star.star_handler import StarHandlerMetadata
+
+from .command_model import CommandRecord, first_line
+
+
+def build_command_record(
+    handler: StarHandlerMetadata, plugin: str = ""
+) -> Optional[CommandRecord]:
+    """把处理器转换为命令记录，非命令类处理器返回 None"""
+    # 遍历处理器的过滤器，查找命令或命令组，找到一个即可
+    for filter_ in handler.event_filters:
+        if isinstance(filter_, CommandFilter):
+            name = filter_.command_name
+            parents = getattr(filter_, "parent_command_names", None) or ()
+            group = " ".join(p for p in parents if p) or None
+            break
+        if isinstance(filter_, CommandGroupFilter):
+            name = filter_.group_name
+            parent = getattr(filter_, "parent_group", None)
+            group = getattr(parent, "group_name", None)
+            break
+    else:
+        return None
+    if not name:
+        return None
+    aliases: Tuple[str, ...] = tuple(sorted(getattr(filter_, "alias", None) or ()))
+    # 带有管理员权限过滤器的命令只对管理员展示
+    admin_only = any(
+        isinstance(f, PermissionTypeFilter)
+        and getattr(f, "permission_type", None) == PermissionType.ADMIN
+        for f in handler.event_filters
+    )
+    return CommandRecord(
+        name, first_line(handler.desc), plugin, aliases, group, admin_only
+    )
+
+
+class HandlerIndex:
+    """module_path -> 命令记录 的索引，随处理器注册表增量更新"""
+
+    def __init__(self) -> None:
+        # id(handler) -> handler，持有引用以保证 id 在移除前不会被复用
+        self._known: Dict[int, StarHandlerMetadata] = {}
+        # module_path -> {id(handler): 命令记录（plugin 字段在取出时填入）}
+        self._by_module: Dict[str, Dict[int, CommandRecord]] = collections.defaultdict(
+            dict
+        )
+
+    def refresh(self, registry: Iterable) -> None:
+        """与当前注册表做差量同步，只处理新增和移除的处理器"""
+        current = {
+            id(handler): handler
+            for handler in registry
+            if isinstance(handler, StarHandlerMetadata)
+        }
+        if current.keys() == self._known.keys():
+            return
+        for handler_id in self._known.keys() - current.keys():
+            handler = self._known.pop(handler_id)
+            commands = self._by_module.get(handler.handler_module_path)
+            if commands is not None:
+                commands.pop(handler_id, None)
+                if not commands:
+                    del self._by_module[handler.handler_module_path]
+        for handler_id, handler in current.items():
+            if handler_id in self._known:
+                continue
+            self._known[handler_id] = handler
+            record = build_command_record(handler)
+            if record:
+                self._by_module[handler.handler_module_path][handler_id] = record
+
+    def commands_for(self, module_path: str, plugin: str = "") -> List[CommandRecord]:
+        """返回某个模块下的命令记录（保持注册顺序），名称与描述相同的只保留一条"""
+        commands = self._by_module.get(module_path)
+        if not commands:
+            return []
+        unique: Dict[Tuple[str, Optional[str]], CommandRecord] = {}
+        for record in commands.values():
+            unique.setdefault((record.name, record.description), record)
+        return [record._replace(plugin=plugin) for record in unique.values()]
@@ -0,0 +1,69 @@
+import functools
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class CommandRecord(NamedTuple):
+    """一条命令：从采集到绘制全程使用，不再经过 "cmd#desc" 字符串中转"""
+
+    name: str
+    description: Optional[str]
+    plugin: str
+    aliases: Tuple[str, ...] = ()
+    # 所属指令组（如 "tool"），顶层指令为 None
+    group: Optional[str] = None
+    # 仅管理员可用
+    admin_only: bool = False
+
+
+# {插件名: [命令]}
+PluginCommands = Dict[str, List[CommandRecord]]
+
+
+def first_line(text: Optional[str]) -> Optional[str]:
+    """描述只保留第一行"""
+    if not text:
+        return None
+    return text.strip().splitlines()[0].strip() or None
+
+
+@functools.lru_cache(maxsize=16)
+def parse_command_lines(
+    lines: Tuple[str, ...], plugin: str = ""
+) -> Tuple[CommandRecord, ...]:
+    """解析用户填写的文本命令（custom_cmds 及内置指令表），同样的内容只解析一次
+
+    每行一条，格式为 “命令 : 描述” 或 “命令#描述”；以空白缩进的行接到上一条的描述后，
+    [分组] 行会被忽略。描述中带有 (op) 的视为仅管理员可用。
+    """
+    commands: List[Tuple[str, Optional[str]]] = []
+    for raw in lines:
+        stripped = raw.strip()
+        if not stripped or (stripped.startswith("[") and stripped.endswith("]")):
+            continue
+        if (raw.startswith("  ") or raw.startswith("\t")) and commands:
+            cmd, desc = commands[-1]
+            commands[-1] = (cmd, (desc or "") + stripped)
+            continue
+
+        # 新命令解析：按优先级取第一个出现的分隔符
+        for sep in (" : ", " # ", "#", ":"):
+            if sep in stripped:
+                cmd, desc = stripped.split(sep, 1)
+                cmd, desc = cmd.strip(), desc.strip()
+                break
+        else:
+            cmd, desc = stripped, None
+        if cmd.startswith("- "):
+            cmd = cmd[2:].strip()
+        commands.append((cmd, desc))
+
+    records = []
+    for cmd, desc in commands:
+        desc = first_line(desc)
+        admin_only = bool(desc) and "(op)" in desc
+        records.append(CommandRecord(cmd, desc, plugin, admin_only=admin_only))
+    return tuple(records)
+
+
+def parse_command_text(text: str, plugin: str = "") -> Tuple[CommandRecord, ...]:
+    return parse_command_lines(tuple(text.strip().splitlines()), plugin)
@@ -0,0 +1,65 @@
+import hashlib
+from typing import Callable, Dict, Iterable, NamedTuple
+
+from .command_model import CommandRecord
+
+
+class HelpVariant(NamedTuple):
+    """某个调用者可见的命令集合：mask 为命令表上的位掩码，signature 用于缓存键"""
+
+    mask: int
+    # 全部命令可见时为空串，与不区分权限时的缓存键保持一致
+    signature: str = ""
+
+
+class CommandTable:
+    """预先编号的命令表：每条命令占一位，按插件与权限预先算好位掩码
+
+    按权限、会话过滤时只需对几个整数做位运算，得到的掩码同时作为缓存的区分依据，
+    可见命令相同的调用者共用同一份分区和图片。
+    """
+
+    # 不是真实插件，不受会话/平台的插件启用状态影响
+    VIRTUAL_PLUGINS = ("内置指令", "自定义命令")
+
+    def __init__(self, records: Iterable[CommandRecord]) -> None:
+        self.index: Dict[CommandRecord, int] = {}
+        self.plugin_masks: Dict[str, int] = {}
+        self.admin_mask = 0
+        for record in records:
+            if record in self.index:
+                continue
+            bit = 1 << len(self.index)
+            self.index[record] = bit
+            if record.plugin not in self.VIRTUAL_PLUGINS:
+                self.plugin_masks[record.plugin] = (
+                    self.plugin_masks.get(record.plugin, 0) | bit
+                )
+            if record.admin_only:
+                self.admin_mask |= bit
+        self.full_mask = (1 << len(self.index)) - 1
+
+    def variant(
+        self, is_admin: bool, plugin_enabled: Callable[[str], bool]
+    ) -> HelpVariant:
+        """计算调用者可见的命令掩码"""
+        mask = self.full_mask
+        if not is_admin:
+            mask &= ~self.admin_mask
+        for plugin, plugin_mask in self.plugin_masks.items():
+            if not plugin_enabled(plugin):
+                mask &= ~plugin_mask
+        if mask == self.full_mask:
+            return HelpVariant(mask)
+        raw = mask.to_bytes((mask.bit_length() + 7) // 8 or 1, "little")
+        return HelpVariant(mask, hashlib.blake2b(raw, digest_size=8).hexdigest())
+
+    def allows(self, variant: HelpVariant) -> Callable[[CommandRecord], bool]:
+        """供分区解析、搜索使用的过滤函数；命令表之外的记录一律保留"""
+        mask = variant.mask
+
+        def allowed(record: CommandRecord) -> bool:
+            bit = self.index.get(record)
+            return bit is None or bool(mask & bit)
+
+        return allowed
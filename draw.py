@@ -1,7 +1,12 @@
+import collections
+import functools
 import io
 import os
 import textwrap
-from typing import Dict, List, Tuple, Any
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
@@ -9,6 +14,78 @@ from PIL import Image, ImageDraw, ImageFont
 from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 
+from .assets import load_font, load_transparent_logo
+from .command_model import (
+    CommandRecord,
+    PluginCommands,
+    parse_command_lines,
+    parse_command_text,
+)
+from .png_stream import StreamingPNGWriter
+from .text_cache import TextRunCache
+from .text_wrap import PixelTextWrapper
+
+
+# 解析后的分区：(分区名, [(命令, 描述)])
+Section = Tuple[str, List[Tuple[str, str | None]]]
+# 渲染统计：各阶段耗时（*_ms）及输出尺寸、体积等
+RenderStats = Dict[str, Any]
+
+
+@dataclass(slots=True)
+class CardLayout:
+    """单张命令卡片的排版结果（坐标相对分区顶部），绘制阶段直接使用，无需再次测量"""
+
+    x: int
+    y: int
+    width: int
+    height: int
+    name: str
+    desc_lines: Tuple[str, ...]
+    desc_y: int
+    line_height: int
+
+
+@dataclass(slots=True)
+class SectionLayout:
+    """一个分区（标题 + 卡片）的排版结果，标题位于分区顶部"""
+
+    name: str
+    cards: Tuple[CardLayout, ...]
+    # 分区顶部到最后一张卡片底部的距离，最后一个分区以此计算图片总高度
+    content_height: int
+    # 分区占用的总高度（含分区后的间距）
+    height: int
+
+
+class FontSet(NamedTuple):
+    """某一缩放倍数下的整套字体"""
+
+    title: ImageFont.FreeTypeFont
+    subtitle: ImageFont.FreeTypeFont
+    plugin_header: ImageFont.FreeTypeFont
+    command: ImageFont.FreeTypeFont
+    desc: ImageFont.FreeTypeFont
+    footer: ImageFont.FreeTypeFont
+
+
+class TilePlacement(NamedTuple):
+    """分区图块在画布上的位置"""
+
+    key: Tuple[str, tuple]
+    y: int
+    height: int
+    tile: Image.Image
+
+
+class CanvasState(NamedTuple):
+    """上一次合成的画布及其分区布局，用于增量重绘"""
+
+    # (总高度, 副标题, 页脚文字, 缩放倍数)，任一变化都需要完整合成
+    key: Tuple[int, str, str, float]
+    placements: Tuple[Tuple[Tuple[str, tuple], int, int], ...]
+    image: Image.Image
+
 
 class AstrBotHelpDrawer:
     # ---------------- 常量区 ----------------
@@ -56,6 +133,27 @@ class AstrBotHelpDrawer:
     CARD_PADDING_BOTTOM = 10
     NAME_DESC_SPACING = 12
 
+    # 字号（1x 下的逻辑尺寸）
+    FONT_SIZE_TITLE = 36
+    FONT_SIZE_SUBTITLE = 18
+    FONT_SIZE_PLUGIN_HEADER = 20
+    FONT_SIZE_COMMAND = 15
+    FONT_SIZE_DESC = 13
+    FONT_SIZE_FOOTER = 12
+
+    # 支持的缩放倍数范围，用于高分屏输出
+    MIN_SCALE = 0.5
+    MAX_SCALE = 4.0
+
+    # 卡片排版：grid 按行对齐，masonry 放入最矮的一列；列数为 0 时按内容自动选择
+    LAYOUT_MODES = ("grid", "masonry")
+    DEFAULT_CARD_COLUMNS = 4
+    AUTO_COLUMN_CANDIDATES = (4, 5, 3, 2)
+    # 排版缓存的条目上限，单条只有几百字节
+    LAYOUT_CACHE_SIZE = 1024
+
+    DEFAULT_SUBTITLE = "可用插件及指令列表"
+
     # 内置指令文本
     BUILT_IN_COMMANDS_TEXT = textwrap.dedent("""
         [System]
@@ -82,113 +180,193 @@ class AstrBotHelpDrawer:
         /key : API Key(op)
         /websearch : 网页搜索
     """).strip()
+    # 内置指令在导入时解析一次
+    BUILT_IN_COMMANDS = parse_command_text(BUILT_IN_COMMANDS_TEXT, "内置指令")
 
     # ---------------- 构造函数 ----------------
     def __init__(self, config: AstrBotConfig) -> None:
         self.config = config
+        # 已光栅化文本的缓存，跨渲染复用，只有新出现的字符串才需要走 FreeType
+        self.text_cache = TextRunCache(getattr(config, "text_cache_size", 4096))
+        # 按像素宽度换行，字符宽度按字体缓存
+        self.text_wrapper = PixelTextWrapper()
+        # 输出缩放倍数：排版始终以 1x 逻辑尺寸进行，绘制时再换算为设备像素
+        self.scale = self._normalize_scale(getattr(config, "render_scale", 1.0))
+        self.layout_mode = getattr(config, "layout_mode", "grid")
+        if self.layout_mode not in self.LAYOUT_MODES:
+            logger.warning(f"未知的排版模式 '{self.layout_mode}'，已改用 grid")
+            self.layout_mode = "grid"
+        self.card_columns = min(
+            max(int(getattr(config, "card_columns", self.DEFAULT_CARD_COLUMNS)), 0), 6
+        )
+        # 分区排版缓存：(分区名, 命令) -> 排版，与缩放倍数无关，各倍数共用
+        # 分区图块缓存：((分区名, 命令), 缩放倍数) -> 图块，每个倍数单独缓存
+        # 两者都在一次渲染结束后才淘汰，且不淘汰本次用到的条目，分区数超过上限时
+        # 下一次渲染仍能全部命中
+        self.tile_cache_size = max(1, getattr(config, "tile_cache_size", 64))
+        self._layout_cache: collections.OrderedDict[
+            Tuple[str, tuple], SectionLayout
+        ] = collections.OrderedDict()
+        self._tile_cache: collections.OrderedDict[
+            Tuple[Tuple[str, tuple], float], Image.Image
+        ] = collections.OrderedDict()
+        self._tile_lock = threading.Lock()
+        # 上一次合成的画布，分区变化时只重绘变化的部分
+        self._last_canvas: CanvasState | None = None
+        # 最近一次渲染的各阶段耗时，以及编码的格式、尺寸、体积与耗时
+        self.last_render_stats: RenderStats = {}
+        self.last_encode_stats: RenderStats = {}
         self._load_fonts()
         self._load_logo()
 
     # ---------------- 字体 & Logo ----------------
     def _load_fonts(self) -> None:
+        # 字体对象按 (路径, 字号) 进程内共享，重复创建绘图器时不会重新打开字体文件
         try:
-            self.font_title = ImageFont.truetype(self.FONT_PATH_BOLD, 36)
-            self.font_subtitle = ImageFont.truetype(self.FONT_PATH_REGULAR, 18)
-            self.font_plugin_header = ImageFont.truetype(self.FONT_PATH_BOLD, 20)
-            self.font_command = ImageFont.truetype(self.FONT_PATH_BOLD, 15)
-            self.font_desc = ImageFont.truetype(self.FONT_PATH_REGULAR, 13)
-            self.font_footer = ImageFont.truetype(self.FONT_PATH_REGULAR, 12)
+            fonts = self._font_set(1.0)
+            self.font_title = fonts.title
+            self.font_subtitle = fonts.subtitle
+            self.font_plugin_header = fonts.plugin_header
+            self.font_command = fonts.command
+            self.font_desc = fonts.desc
+            self.font_footer = fonts.footer
+            if self.scale != 1.0:
+                self._font_set(self.scale)
         except Exception as e:
             logger.error(f"加载字体时出错: {e}")
             exit()
 
+    def _font_set(self, scale: float) -> FontSet:
+        """按缩放倍数取整套字体（load_font 自带缓存）"""
+        return FontSet(
+            title=load_font(self.FONT_PATH_BOLD, self._px(self.FONT_SIZE_TITLE, scale)),
+            subtitle=load_font(
+                self.FONT_PATH_REGULAR, self._px(self.FONT_SIZE_SUBTITLE, scale)
+            ),
+            plugin_header=load_font(
+                self.FONT_PATH_BOLD, self._px(self.FONT_SIZE_PLUGIN_HEADER, scale)
+            ),
+            command=load_font(
+                self.FONT_PATH_BOLD, self._px(self.FONT_SIZE_COMMAND, scale)
+            ),
+            desc=load_font(
+                self.FONT_PATH_REGULAR, self._px(self.FONT_SIZE_DESC, scale)
+            ),
+            footer=load_font(
+                self.FONT_PATH_REGULAR, self._px(self.FONT_SIZE_FOOTER, scale)
+            ),
+        )
+
     def _load_logo(self) -> None:
+        # 处理后的 Logo 会缓存在内存和源文件旁的 PNG 中，重载插件时无需重新抠图
         try:
-            logo_img = Image.open(self.LOGO_PATH).convert("RGBA")
-            img_data = np.array(logo_img)
-            r, g, b, a = img_data.T
-            white_areas = (
-                (r >= self.COLOR_LOGO_BG_REMOVE[0] - self.LOGO_BG_TOLERANCE)
-                & (g >= self.COLOR_LOGO_BG_REMOVE[1] - self.LOGO_BG_TOLERANCE)
-                & (b >= self.COLOR_LOGO_BG_REMOVE[2] - self.LOGO_BG_TOLERANCE)
-                & (a > 128)
-            )
-            img_data[..., -1][white_areas.T] = 0
-            logo_transparent = Image.fromarray(img_data)
-            ow, oh = logo_transparent.size
-            new_w = int(self.LOGO_TARGET_HEIGHT * ow / oh)
-            self.resized_logo = logo_transparent.resize(
-                (new_w, self.LOGO_TARGET_HEIGHT), Image.Resampling.LANCZOS
+            self.resized_logo = load_transparent_logo(
+                self.LOGO_PATH,
+                self.LOGO_TARGET_HEIGHT,
+                self.COLOR_LOGO_BG_REMOVE,
+                self.LOGO_BG_TOLERANCE,
             )
         except Exception as e:
             logger.warning(f"加载或处理 Logo 时出错: {e}")
             self.resized_logo = None
 
-    # ---------------- 文本解析 ----------------
+    def _logo_for(self, scale: float) -> Image.Image | None:
+        """指定缩放倍数下的 Logo，直接按目标高度从原图缩放，避免二次插值"""
+        if scale == 1.0 or self.resized_logo is None:
+            return self.resized_logo
+        try:
+            return load_transparent_logo(
+                self.LOGO_PATH,
+                self._px(self.LOGO_TARGET_HEIGHT, scale),
+                self.COLOR_LOGO_BG_REMOVE,
+                self.LOGO_BG_TOLERANCE,
+            )
+        except Exception as e:
+            logger.warning(f"加载或处理 Logo 时出错: {e}")
+            return None
+
+    # ---------------- 缩放 ----------------
+    @classmethod
+    def _normalize_scale(cls, value: Any) -> float:
+        try:
+            scale = float(value)
+        except (TypeError, ValueError):
+            logger.warning(f"无效的缩放倍数 '{value}'，已改用 1")
+            return 1.0
+        return min(max(scale, cls.MIN_SCALE), cls.MAX_SCALE)
+
     @staticmethod
-    def _parse_single_command_list(text_list) -> List[Tuple[str, str | None]]:
-        commands = []
-        lines = (
-            text_list.strip().splitlines()
-            if isinstance(text_list, str)
-            else [ln for ln in text_list if ln.strip()]
-        )
+    def _px(value: float, scale: float) -> int:
+        """逻辑尺寸换算为设备像素，1x 时原样返回"""
+        return int(round(value * scale))
 
-        for line in lines:
-            raw = line
-            stripped = line.strip()
-            if not stripped or (stripped.startswith("[") and stripped.endswith("]")):
-                continue
-            if (raw.startswith("  ") or raw.startswith("\t")) and commands:
-                cmd, desc = commands[-1]
-                commands[-1] = (cmd, (desc or "") + stripped)
-                continue
+    # ---------------- 文本解析 ----------------
+    @staticmethod
+    def _command_pairs(
+        records: Iterable[CommandRecord],
+        record_filter: Callable[[CommandRecord], bool] | None = None,
+    ) -> List[Tuple[str, str | None]]:
+        """分区内只需要命令名和描述；record_filter 用于剔除调用者不可见的命令"""
+        return [
+            (record.name, record.description)
+            for record in records
+            if record_filter is None or record_filter(record)
+        ]
 
-            # 新命令解析
-            parts = next(
-                (
-                    stripped.split(sep, 1)
-                    for sep in (" : ", " # ", "#", ":")
-                    if sep in stripped
-                ),
-                None,
-            )
-            if parts and len(parts) == 2:
-                cmd = (
-                    parts[0][2:].strip()
-                    if parts[0].startswith("- ")
-                    else parts[0].strip()
-                )
-                desc = parts[1].strip()
-            else:
-                cmd = stripped[2:].strip() if stripped.startswith("- ") else stripped
-                desc = None
-            commands.append((cmd, desc))
+    def _custom_commands(self) -> Tuple[CommandRecord, ...]:
+        """解析 custom_cmds，内容不变时直接复用解析结果"""
+        custom_cmds = getattr(self.config, "custom_cmds", None)
+        if not custom_cmds:
+            return ()
+        if isinstance(custom_cmds, str):
+            return parse_command_text(custom_cmds, "自定义命令")
+        return parse_command_lines(tuple(custom_cmds), "自定义命令")
 
-        # 只保留描述第一行
-        return [(c, (d.splitlines()[0].strip() if d else None)) for c, d in commands]
+    def iter_records(self, plugin_dict: PluginCommands) -> Iterable[CommandRecord]:
+        """按帮助图中会出现的范围（内置、未拉黑的插件、自定义）逐条给出命令记录"""
+        if getattr(self.config, "show_builtin_cmds", True):
+            yield from self.BUILT_IN_COMMANDS
+        blacklist = getattr(self.config, "plugin_blacklist", [])
+        for name, records in plugin_dict.items():
+            if name != "内置指令" and name not in blacklist:
+                yield from records
+        yield from self._custom_commands()
 
     def _parse_plugin_commands_sorted_grouped(
-        self, plugin_dict: Dict[str, Any]
-    ) -> List[Tuple[str, List[Tuple[str, str | None]]]]:
+        self,
+        plugin_dict: PluginCommands,
+        name_filter: Callable[[str], bool] | None = None,
+        record_filter: Callable[[CommandRecord], bool] | None = None,
+    ) -> List[Section]:
+        """解析为分区列表；指定 name_filter 时只保留名称匹配的分区，且不合并简易指令
+
+        record_filter 按调用者权限、会话设置逐条过滤命令，过滤后为空的分区不再显示。
+        """
+
+        def selected(name: str) -> bool:
+            return name_filter is None or name_filter(name)
+
         # 是否显示内置指令
-        if getattr(self.config, "show_builtin_cmds", True):
-            built_in_list = self._parse_single_command_list(self.BUILT_IN_COMMANDS_TEXT)
+        if getattr(self.config, "show_builtin_cmds", True) and selected("内置指令"):
+            built_in_list = self._command_pairs(self.BUILT_IN_COMMANDS, record_filter)
             built_in_plugin = ("内置指令", built_in_list) if built_in_list else None
         else:
             built_in_plugin = None
 
         large_plugins, small_plugins = [], []
-        for name, cmds_raw in plugin_dict.items():
-            if name == "内置指令" or not cmds_raw:
+        for name, records in plugin_dict.items():
+            if name == "内置指令" or not records or not selected(name):
                 continue
-             # 如果在黑名单里，跳过
+            # 如果在黑名单里，跳过
             if name in getattr(self.config, "plugin_blacklist", []):
                 continue
-            cmds = self._parse_single_command_list(cmds_raw)
+            cmds = self._command_pairs(records, record_filter)
             if not cmds:
                 continue
-            (small_plugins if len(cmds) == 1 else large_plugins).append((name, cmds))
+            if len(cmds) == 1 and name_filter is None:
+                small_plugins.append((name, cmds))
+            else:
+                large_plugins.append((name, cmds))
 
         large_plugins.sort(key=lambda x: len(x[1]), reverse=True)
 
@@ -208,46 +386,92 @@ class AstrBotHelpDrawer:
 
         # 添加自定义命令
         custom_list = []
-        if getattr(self.config, "custom_cmds", None):
-            custom_list = self._parse_single_command_list(self.config.custom_cmds)
+        if selected("自定义命令"):
+            custom_list = self._command_pairs(self._custom_commands(), record_filter)
             if custom_list:
                 result.append(("自定义命令", custom_list))
                 logger.info(f"-> 创建 '自定义命令' ({len(custom_list)} 条)")
 
         return result
 
+    def parse_sections(
+        self,
+        plugin_dict: PluginCommands,
+        query: str | None = None,
+        record_filter: Callable[[CommandRecord], bool] | None = None,
+    ) -> List[Section]:
+        """解析出要绘制的分区；query 非空时只保留名称包含该关键字的分区（不区分大小写）"""
+        if not query:
+            return self._parse_plugin_commands_sorted_grouped(
+                plugin_dict, record_filter=record_filter
+            )
+        keyword = query.strip().lower()
+        return self._parse_plugin_commands_sorted_grouped(
+            plugin_dict, lambda name: keyword in name.lower(), record_filter
+        )
+
+    @staticmethod
+    def paginate_sections(
+        sections: List[Section], page: int, page_size: int
+    ) -> Tuple[List[Section], int]:
+        """按分区数分页，返回第 page 页（从 1 开始）的分区及总页数"""
+        page_size = max(1, page_size)
+        page_count = max(1, -(-len(sections) // page_size))
+        start = (page - 1) * page_size
+        if page < 1 or page > page_count:
+            return [], page_count
+        return sections[start : start + page_size], page_count
+
     # ---------------- 绘图辅助 ----------------
     @staticmethod
-    def _draw_gradient(
-        draw,
+    @functools.lru_cache(maxsize=16)
+    def _gradient_column(
+        height: int,
+        start: Tuple[int, int, int],
+        end: Tuple[int, int, int],
+    ) -> Image.Image:
+        """按行线性插值的渐变色，只缓存 1 像素宽的一列，用时再横向铺开"""
+        ys = np.arange(height, dtype=np.int64)
+        # 与逐行 int(start + (end - start) * y / height) 的结果逐像素一致
+        column = np.stack(
+            [(s + (e - s) * ys / height).astype(np.uint8) for s, e in zip(start, end)],
+            axis=-1,
+        )
+        return Image.fromarray(column[:, np.newaxis, :])
+
+    @staticmethod
+    def _gradient_rows(
         width: int,
         height: int,
+        top: int,
+        bottom: int,
         start: Tuple[int, int, int],
         end: Tuple[int, int, int],
-    ):
-        for y in range(height):
-            r = int(start[0] + (end[0] - start[0]) * y / height)
-            g = int(start[1] + (end[1] - start[1]) * y / height)
-            b = int(start[2] + (end[2] - start[2]) * y / height)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+    ) -> Image.Image:
+        """渐变背景中 [top, bottom) 的若干行（新图片，可直接在上面绘制）"""
+        column = AstrBotHelpDrawer._gradient_column(height, start, end)
+        # 从 1 像素宽最近邻放大，每行都是同一颜色的原样复制
+        return column.crop((0, top, 1, bottom)).resize(
+            (width, bottom - top), Image.NEAREST
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _text_bbox(
+        text: str, font: ImageFont.FreeTypeFont
+    ) -> Tuple[int, int, int, int]:
+        """字体层面的文本包围盒，同一字符串只测量一次"""
+        return font.getbbox(text)
 
     def _get_text_metrics(
-        self, text: str, font: ImageFont.FreeTypeFont, draw
+        self, text: str, font: ImageFont.FreeTypeFont
     ) -> Tuple[Tuple[int, int, int, int], Tuple[int, int]]:
         if not text:
             return (0, 0, 0, 0), (0, 0)
         try:
-            bbox = draw.textbbox((0, 0), text, font=font)
+            bbox = self._text_bbox(text, font)
             w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
             return bbox, (w, h)
-        except AttributeError:
-            w = draw.textlength(text, font=font)
-            h = (
-                sum(font.getmetrics())
-                if sum(font.getmetrics()) > 0
-                else font.size * 1.2
-            )
-            return (0, 0, int(w), int(h)), (int(w), int(h))
         except Exception:
             est_w = len(text) * font.size * 0.6
             est_h = font.size * 1.2
@@ -256,9 +480,30 @@ class AstrBotHelpDrawer:
                 max(1, int(est_h)),
             )
 
-    def _draw_rounded_rectangle(
-        self, draw, xy, radius, fill=None, outline=None, width=1
-    ):
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _card_sprite(
+        width: int,
+        height: int,
+        radius: int,
+        fill: Tuple[int, int, int] | None,
+        outline: Tuple[int, int, int] | None,
+        outline_width: int = 1,
+    ) -> Image.Image:
+        """预渲染的卡片背景（透明底 RGBA），同尺寸同配色的卡片共用一张"""
+        sprite = Image.new("RGBA", (width + 1, height + 1), (0, 0, 0, 0))
+        AstrBotHelpDrawer._draw_rounded_rectangle(
+            ImageDraw.Draw(sprite),
+            (0, 0, width, height),
+            radius,
+            fill=fill,
+            outline=outline,
+            width=outline_width,
+        )
+        return sprite
+
+    @staticmethod
+    def _draw_rounded_rectangle(draw, xy, radius, fill=None, outline=None, width=1):
         x1, y1, x2, y2 = xy
         if x1 >= x2 or y1 >= y2:
             return
@@ -311,239 +556,656 @@ class AstrBotHelpDrawer:
             draw.line([(x2, y1 + radius), (x2, y2 - radius)], fill=outline, width=width)
 
     # ---------------- 绘制 Logo ----------------
-    def _draw_logo(self, img: Image.Image) -> None:
+    def _draw_logo(
+        self, img: Image.Image, subtitle_text: str, scale: float = 1.0
+    ) -> None:
         """在图片上绘制 logo 及标题、子标题"""
-        if not self.resized_logo:
+        logo = self._logo_for(scale)
+        if not logo:
             return
-        draw = ImageDraw.Draw(img)
+        fonts = self._font_set(scale)
+        padding = self._px(self.PADDING, scale)
         # 贴图
-        img.paste(self.resized_logo, (self.PADDING, self.PADDING), self.resized_logo)
+        img.paste(logo, (padding, padding), logo)
         # 标题文字
         title_text = "AstrBot 命令帮助"
-        subtitle_text = "可用插件及指令列表"
-        logo_w, logo_h = self.resized_logo.size
-        x_start = self.PADDING + logo_w + 15
-        y_start_title = self.PADDING
-        y_start_subtitle = (
-            self.PADDING
-            + self.font_title.getbbox(title_text)[3]
-            - self.font_title.getbbox(title_text)[1]
-            + 5
-        )
-        draw.text(
+        logo_w, logo_h = logo.size
+        x_start = padding + logo_w + self._px(15, scale)
+        y_start_title = padding
+        title_bbox = self._text_bbox(title_text, fonts.title)
+        y_start_subtitle = padding + title_bbox[3] - title_bbox[1] + self._px(5, scale)
+        self.text_cache.draw(
+            img,
             (x_start, y_start_title),
             title_text,
-            font=self.font_title,
-            fill=self.COLOR_TEXT_HEADER,
+            fonts.title,
+            self.COLOR_TEXT_HEADER,
         )
-        draw.text(
+        self.text_cache.draw(
+            img,
             (x_start, y_start_subtitle),
             subtitle_text,
-            font=self.font_subtitle,
-            fill=self.COLOR_TEXT_SUBTITLE,
+            fonts.subtitle,
+            self.COLOR_TEXT_SUBTITLE,
         )
 
-    # ---------------- 卡片布局（每行最多 4 张） ----------------
-    def _layout_cards(
-        self,
-        sections: List[Tuple[str, List[Tuple[str, str | None]]]],
-        draw,
-    ) -> List[Dict]:
-        layout_info = []
-        y_offset = self.TOP_AREA_HEIGHT + self.PADDING
-        max_cols = 4
+    # ---------------- 卡片布局 ----------------
+    def _card_width(self, columns: int) -> int:
+        return (
+            self.IMG_WIDTH - self.PADDING * 2 - self.CARD_SPACING * (columns - 1)
+        ) // columns
+
+    def _layout_section(
+        self, section_name: str, cmds: List[Tuple[str, str | None]]
+    ) -> SectionLayout:
+        """一次性完成单个分区的测量与排版，坐标相对分区顶部"""
+        if self.card_columns:
+            return self._layout_section_columns(section_name, cmds, self.card_columns)
+        # 自动列数：在命令名能放进卡片的前提下取分区最矮的列数，高度相同时优先默认列数
+        name_width = max(
+            (self.text_wrapper.text_width(cmd, self.font_command) for cmd, _ in cmds),
+            default=0,
+        )
+        best: SectionLayout | None = None
+        for columns in self.AUTO_COLUMN_CANDIDATES:
+            if name_width > self._card_width(columns) - self.CARD_PADDING_X * 2:
+                continue
+            layout = self._layout_section_columns(section_name, cmds, columns)
+            if best is None or layout.height < best.height:
+                best = layout
+        if best is None:
+            best = self._layout_section_columns(
+                section_name, cmds, min(self.AUTO_COLUMN_CANDIDATES)
+            )
+        return best
+
+    def _layout_section_columns(
+        self, section_name: str, cmds: List[Tuple[str, str | None]], max_cols: int
+    ) -> SectionLayout:
+        """按指定列数排版；grid 模式逐行对齐，masonry 模式每张卡片放入当前最矮的一列"""
         card_spacing = self.CARD_SPACING
-        card_width = (
-            self.IMG_WIDTH - self.PADDING * 2 - card_spacing * (max_cols - 1)
-        ) // max_cols
-
-        for section_name, cmds in sections:
-            # Section Header
-            layout_info.append({"type": "header", "name": section_name, "y": y_offset})
-            y_offset += self.SECTION_HEADER_HEIGHT + self.SECTION_SPACING_BELOW_HEADER
-
-            row_cards = []
-            col_idx = 0
-            max_row_height = 0
-
-            for cmd, desc in cmds:
-                # 命令文本高度
-                _, (w_cmd, h_cmd) = self._get_text_metrics(cmd, self.font_command, draw)
-
-                # 自动换行 desc，每行 12 字符
-                wrapped_desc = textwrap.wrap(desc or "", width=12)
-                bbox = self.font_desc.getbbox("A")
-                line_height = bbox[3] - bbox[1] + self.CARD_INTERNAL_SPACE
-
-                # 卡片总高度
-                h_desc_total = len(wrapped_desc) * line_height if wrapped_desc else 0
-                card_h = max(
-                    self.CARD_PADDING_TOP
-                    + h_cmd
-                    + self.NAME_DESC_SPACING
-                    + h_desc_total
-                    + self.CARD_PADDING_BOTTOM,
-                    35,
-                )
+        card_width = self._card_width(max_cols)
+        desc_width = card_width - self.CARD_PADDING_X * 2
+        # 描述行高对所有卡片都一样，只测量一次
+        desc_bbox = self._text_bbox("A", self.font_desc)
+        line_height = desc_bbox[3] - desc_bbox[1] + self.CARD_INTERNAL_SPACE
+        masonry = self.layout_mode == "masonry"
 
-                row_cards.append(
-                    {
-                        "type": "card",
-                        "name": cmd,
-                        "desc": desc,
-                        "height": card_h,
-                    }
-                )
-                max_row_height = max(max_row_height, card_h)
-                col_idx += 1
-
-                # 达到一行或最后一张
-                if col_idx == max_cols:
-                    for i, card in enumerate(row_cards):
-                        card["x"] = self.PADDING + i * (card_width + card_spacing)
-                        card["y"] = y_offset
-                        card["width"] = card_width
-                    layout_info.extend(row_cards)
-                    y_offset += max_row_height + card_spacing
-                    row_cards = []
-                    col_idx = 0
-                    max_row_height = 0
-
-            # 剩余不足一行的卡片
-            if row_cards:
-                for i, card in enumerate(row_cards):
-                    card["x"] = self.PADDING + i * (card_width + card_spacing)
-                    card["y"] = y_offset
-                    card["width"] = card_width
-                layout_info.extend(row_cards)
-                y_offset += max_row_height + card_spacing
-
-            y_offset += self.SECTION_SPACING_AFTER_CARDS
-        return layout_info
-
-    # ---------------- 绘制卡片（每行多张支持） ----------------
-    def _draw_cards(self, img: Image.Image, layout_info: List[Dict]) -> None:
+        cards: List[CardLayout] = []
+        # Section Header 位于顶部，卡片从其下方开始
+        top = self.SECTION_HEADER_HEIGHT + self.SECTION_SPACING_BELOW_HEADER
+        content_height = 0
+        y_offset = top
+        row: List[CardLayout] = []
+        # masonry 模式下各列的下一个可用位置
+        column_tops = [top] * max_cols
+
+        def close_row() -> None:
+            nonlocal content_height, y_offset, row
+            cards.extend(row)
+            content_height = y_offset + row[-1].height
+            y_offset += max(card.height for card in row) + card_spacing
+            row = []
+
+        for cmd, desc in cmds:
+            # 命令文本高度
+            _, (_, h_cmd) = self._get_text_metrics(cmd, self.font_command)
+
+            # 按卡片内可用的像素宽度自动换行 desc
+            wrapped_desc = tuple(
+                self.text_wrapper.wrap(desc or "", self.font_desc, desc_width)
+            )
+
+            # 卡片总高度
+            h_desc_total = len(wrapped_desc) * line_height
+            card_h = max(
+                self.CARD_PADDING_TOP
+                + h_cmd
+                + self.NAME_DESC_SPACING
+                + h_desc_total
+                + self.CARD_PADDING_BOTTOM,
+                35,
+            )
+
+            if masonry:
+                col = column_tops.index(min(column_tops))
+                card_y = column_tops[col]
+                column_tops[col] += card_h + card_spacing
+            else:
+                col = len(row)
+                card_y = y_offset
+            card = CardLayout(
+                x=self.PADDING + col * (card_width + card_spacing),
+                y=card_y,
+                width=card_width,
+                height=card_h,
+                name=cmd,
+                desc_lines=wrapped_desc,
+                desc_y=card_y
+                + self.CARD_INTERNAL_SPACE
+                + h_cmd
+                + self.NAME_DESC_SPACING,
+                line_height=line_height,
+            )
+            if masonry:
+                cards.append(card)
+                content_height = max(content_height, card_y + card_h)
+                continue
+            row.append(card)
+            # 达到一行
+            if len(row) == max_cols:
+                close_row()
+
+        # 剩余不足一行的卡片
+        if row:
+            close_row()
+        if masonry:
+            y_offset = max(column_tops) if cards else top
+
+        return SectionLayout(
+            name=section_name,
+            cards=tuple(cards),
+            content_height=content_height,
+            height=y_offset + self.SECTION_SPACING_AFTER_CARDS,
+        )
+
+    # ---------------- 绘制分区（每行多张支持） ----------------
+    def _render_section_tile(
+        self, layout: SectionLayout, scale: float = 1.0
+    ) -> Image.Image:
+        """把分区绘制成透明底的 RGBA 图块，合成时按 alpha 贴到背景上"""
+        tile = Image.new(
+            "RGBA",
+            (self._px(self.IMG_WIDTH, scale), self._px(layout.height, scale)),
+            (0, 0, 0, 0),
+        )
+        self._draw_section(tile, layout, scale)
+        return tile
+
+    def _draw_section(
+        self,
+        img: Image.Image,
+        layout: SectionLayout,
+        scale: float = 1.0,
+        top: int = 0,
+    ) -> None:
+        """在 img 上绘制分区，分区顶部位于 img 的第 top 行（设备像素，可为负）
+
+        排版结果是 1x 逻辑坐标，这里统一乘以 scale 换算为设备像素。超出 img 的部分
+        由 Pillow 自动裁掉；完全落在 img 之外的卡片直接跳过，分条带渲染时每条只画
+        与之相交的卡片。所有元素都不透明且无抗锯齿边缘，直接画到背景上与先画成图块
+        再贴上的结果逐像素一致。
+        """
+
+        def px(value: float) -> int:
+            return self._px(value, scale)
+
+        fonts = self._font_set(scale)
         draw = ImageDraw.Draw(img)
-        for item in layout_info:
-            if item["type"] == "header":
-                draw.rectangle(
-                    (
-                        0,
-                        item["y"],
-                        self.IMG_WIDTH,
-                        item["y"] + self.SECTION_HEADER_HEIGHT,
-                    ),
-                    fill=self.COLOR_SECTION_HEADER_BG,
-                )
-                draw.ellipse(
-                    (
-                        self.SECTION_MARKER_PADDING,
-                        item["y"] + self.SECTION_MARKER_PADDING,
-                        self.SECTION_MARKER_PADDING + self.SECTION_MARKER_SIZE,
-                        item["y"]
-                        + self.SECTION_MARKER_PADDING
-                        + self.SECTION_MARKER_SIZE,
-                    ),
-                    fill=self.COLOR_ACCENT,
-                )
-                draw.text(
-                    (
-                        self.SECTION_TITLE_LEFT_MARGIN,
-                        item["y"] + self.SECTION_MARKER_PADDING,
-                    ),
-                    item["name"],
-                    font=self.font_plugin_header,
-                    fill=self.COLOR_TEXT_HEADER,
-                )
-            elif item["type"] == "card":
-                x0, y0 = item["x"], item["y"]
-                x1, y1 = x0 + item["width"], y0 + item["height"]
-                self._draw_rounded_rectangle(
-                    draw,
-                    (x0, y0, x1, y1),
-                    radius=self.CARD_CORNER_RADIUS,
-                    fill=self.COLOR_CARD_BACKGROUND,
-                    outline=self.COLOR_CARD_OUTLINE,
-                    width=1,
-                )
-                # name
-                draw.text(
-                    (x0 + self.CARD_PADDING_X, y0 + self.CARD_PADDING_TOP),
-                    item["name"],
-                    font=self.font_command,
-                    fill=self.COLOR_TEXT_COMMAND,
+        header_height = px(self.SECTION_HEADER_HEIGHT)
+        if top <= img.height and top + header_height >= 0:
+            draw.rectangle(
+                (0, top, px(self.IMG_WIDTH), top + header_height),
+                fill=self.COLOR_SECTION_HEADER_BG,
+            )
+            marker_start = px(self.SECTION_MARKER_PADDING)
+            marker_end = px(self.SECTION_MARKER_PADDING + self.SECTION_MARKER_SIZE)
+            draw.ellipse(
+                (marker_start, top + marker_start, marker_end, top + marker_end),
+                fill=self.COLOR_ACCENT,
+            )
+            self.text_cache.draw(
+                img,
+                (px(self.SECTION_TITLE_LEFT_MARGIN), top + marker_start),
+                layout.name,
+                fonts.plugin_header,
+                self.COLOR_TEXT_HEADER,
+            )
+        radius = px(self.CARD_CORNER_RADIUS)
+        for card in layout.cards:
+            card_top = top + px(card.y)
+            card_height = px(card.height)
+            # 贴图比卡片多 1 像素（右、下边框）
+            if card_top > img.height or card_top + card_height < 0:
+                continue
+            # 卡片背景使用预渲染的贴图，一次 paste 代替十余次绘制调用
+            sprite = self._card_sprite(
+                px(card.width),
+                card_height,
+                radius,
+                self.COLOR_CARD_BACKGROUND,
+                self.COLOR_CARD_OUTLINE,
+                max(1, px(1)),
+            )
+            img.paste(sprite, (px(card.x), card_top), sprite)
+            text_x = px(card.x + self.CARD_PADDING_X)
+            # name
+            self.text_cache.draw(
+                img,
+                (text_x, top + px(card.y + self.CARD_PADDING_TOP)),
+                card.name,
+                fonts.command,
+                self.COLOR_TEXT_COMMAND,
+            )
+            # desc，换行结果在排版阶段已算好
+            for i, line in enumerate(card.desc_lines):
+                self.text_cache.draw(
+                    img,
+                    (text_x, top + px(card.desc_y + i * card.line_height)),
+                    line,
+                    fonts.desc,
+                    self.COLOR_TEXT_DESC,
                 )
-                if item.get("desc"):
-                    wrapped_desc = textwrap.wrap(item["desc"], width=12)
-                    bbox_cmd = self.font_command.getbbox(item["name"])
-                    y_start = (
-                        y0
-                        + self.CARD_INTERNAL_SPACE
-                        + (bbox_cmd[3] - bbox_cmd[1])
-                        + self.NAME_DESC_SPACING
-                    )
-                    line_height = (
-                        self.font_desc.getbbox("A")[3]
-                        - self.font_desc.getbbox("A")[1]
-                        + self.CARD_INTERNAL_SPACE
-                    )
-                    for i, line in enumerate(wrapped_desc):
-                        draw.text(
-                            (x0 + self.CARD_PADDING_X, y_start + i * line_height),
-                            line,
-                            font=self.font_desc,
-                            fill=self.COLOR_TEXT_DESC,
-                        )
+
+    @staticmethod
+    def _tile_key(section: Section) -> Tuple[str, tuple]:
+        name, cmds = section
+        return name, tuple(cmds)
+
+    def _section_layout(
+        self, section: Section, stats: RenderStats | None = None
+    ) -> SectionLayout:
+        """获取分区的逻辑排版，与缩放倍数无关，各倍数共用同一份"""
+        key = self._tile_key(section)
+        with self._tile_lock:
+            layout = self._layout_cache.get(key)
+            if layout is not None:
+                self._layout_cache.move_to_end(key)
+                return layout
+        start = time.perf_counter()
+        layout = self._layout_section(*section)
+        if stats is not None:
+            stats["layout_ms"] += (time.perf_counter() - start) * 1000
+        with self._tile_lock:
+            self._layout_cache[key] = layout
+        return layout
+
+    def _section_tile(
+        self,
+        section: Section,
+        stats: RenderStats | None = None,
+        scale: float = 1.0,
+        layout: SectionLayout | None = None,
+    ) -> Tuple[SectionLayout, Image.Image]:
+        """获取分区的排版与指定倍数的图块，内容相同的分区跨渲染复用"""
+        if layout is None:
+            layout = self._section_layout(section, stats)
+        key = (self._tile_key(section), scale)
+        with self._tile_lock:
+            tile = self._tile_cache.get(key)
+            if tile is not None:
+                self._tile_cache.move_to_end(key)
+                if stats is not None:
+                    stats["tile_hits"] += 1
+                return layout, tile
+        start = time.perf_counter()
+        tile = self._render_section_tile(layout, scale)
+        if stats is not None:
+            stats["tile_misses"] += 1
+            stats["cards_ms"] += (time.perf_counter() - start) * 1000
+        with self._tile_lock:
+            self._tile_cache[key] = tile
+        return layout, tile
+
+    def _trim_caches(self, used: int) -> None:
+        """一次渲染结束后淘汰最久未用的排版与图块
+
+        本次用到的 used 个分区都已移到 LRU 末尾，上限取 max(配置值, used)，
+        淘汰时不会碰到它们；排版只占很少内存，上限放宽到 LAYOUT_CACHE_SIZE。
+        """
+        with self._tile_lock:
+            for cache, limit in (
+                (self._tile_cache, self.tile_cache_size),
+                (self._layout_cache, self.LAYOUT_CACHE_SIZE),
+            ):
+                limit = max(limit, used)
+                while len(cache) > limit:
+                    cache.popitem(last=False)
 
     # ---------------- 主函数 ----------------
-    def draw_help_image(self, plugin_commands_dict: Dict[str, Any]) -> bytes:
-        # 解析插件命令
-        sections = self._parse_plugin_commands_sorted_grouped(plugin_commands_dict)
-
-        # 初步计算总高度
-        temp_img = Image.new("RGB", (self.IMG_WIDTH, 1000), color=(255, 255, 255))
-        draw = ImageDraw.Draw(temp_img)
-        layout_info = self._layout_cards(sections, draw)
-        total_height = (
-            layout_info[-1]["y"]
-            + (layout_info[-1]["height"] if "height" in layout_info[-1] else 0)
-            + self.FOOTER_HEIGHT
-            + self.PADDING
+    def draw_help_image(self, plugin_commands_dict: PluginCommands) -> bytes:
+        """绘制包含全部分区的帮助图"""
+        start = time.perf_counter()
+        sections = self.parse_sections(plugin_commands_dict)
+        parse_ms = (time.perf_counter() - start) * 1000
+        data, stats = self.render_sections(sections)
+        stats["parse_ms"] = round(parse_ms, 3)
+        return data
+
+    def render_sections(
+        self,
+        sections: List[Section],
+        subtitle: str | None = None,
+        scale: float | None = None,
+    ) -> Tuple[bytes, RenderStats]:
+        """绘制指定的分区，各分区图块单独缓存，只有未缓存的分区需要排版和绘制
+
+        scale 默认取配置中的缩放倍数。返回 (图片字节, 各阶段耗时及输出信息)。
+        """
+        scale = self.scale if scale is None else self._normalize_scale(scale)
+        render_start = time.perf_counter()
+        stats: RenderStats = {
+            "sections": len(sections),
+            "tile_hits": 0,
+            "tile_misses": 0,
+            "layout_ms": 0.0,
+            "cards_ms": 0.0,
+            "gradient_ms": 0.0,
+            "scale": scale,
+        }
+        subtitle = subtitle or self.DEFAULT_SUBTITLE
+        footer_text = f"AstrBot v{self.config.version}"
+
+        # 计算各分区位置与总高度（逻辑坐标），放置时换算为设备像素
+        y_offset = self.TOP_AREA_HEIGHT + self.PADDING
+        content_bottom = y_offset
+        positions: List[Tuple[Section, SectionLayout, int]] = []
+        for section in sections:
+            layout = self._section_layout(section, stats)
+            positions.append((section, layout, self._px(y_offset, scale)))
+            content_bottom = y_offset + layout.content_height
+            y_offset += layout.height
+        total_height = self._px(
+            content_bottom + self.FOOTER_HEIGHT + self.PADDING, scale
         )
 
-        # 创建最终图片
-        img = Image.new("RGB", (self.IMG_WIDTH, total_height), color=(255, 255, 255))
-        draw = ImageDraw.Draw(img)
-        # 渐变背景
-        self._draw_gradient(
-            draw,
-            self.IMG_WIDTH,
+        if self._use_banded_render(total_height):
+            data = self._render_banded(
+                positions, total_height, subtitle, footer_text, scale, stats
+            )
+            self._trim_caches(len(positions))
+            stats["total_ms"] = (time.perf_counter() - render_start) * 1000
+            for name, value in stats.items():
+                if name.endswith("_ms"):
+                    stats[name] = round(value, 3)
+            self.last_render_stats = stats
+            return data, stats
+
+        placements: List[TilePlacement] = []
+        for section, layout, y in positions:
+            _, tile = self._section_tile(section, stats, scale, layout)
+            placements.append(
+                TilePlacement(self._tile_key(section), y, tile.height, tile)
+            )
+        self._trim_caches(len(placements))
+
+        compose_start = time.perf_counter()
+        canvas_key = (total_height, subtitle, footer_text, scale)
+        previous = self._last_canvas
+        stats["incremental"] = previous is not None and previous.key == canvas_key
+        if stats["incremental"]:
+            # 尺寸和页眉页脚都没变，只重绘内容有变化的分区
+            img = self._patch_canvas(
+                previous, placements, total_height, footer_text, scale
+            )
+        else:
+            img = self._compose_canvas(
+                placements, total_height, subtitle, footer_text, stats, scale
+            )
+        self._last_canvas = CanvasState(
+            canvas_key,
+            tuple((p.key, p.y, p.height) for p in placements),
+            img,
+        )
+        stats["compose_ms"] = (time.perf_counter() - compose_start) * 1000 - stats[
+            "gradient_ms"
+        ]
+
+        # 转成 bytes
+        data, encode_stats = self._encode_image(img)
+        stats.update(encode_stats)
+        stats["total_ms"] = (time.perf_counter() - render_start) * 1000
+        for name, value in stats.items():
+            if name.endswith("_ms"):
+                stats[name] = round(value, 3)
+        self.last_encode_stats = encode_stats
+        self.last_render_stats = stats
+        return data, stats
+
+    # ---------------- 分条带渲染 ----------------
+    def _use_banded_render(self, total_height: int) -> bool:
+        """图片高度达到阈值且输出为 PNG 时改用分条带渲染"""
+        min_height = getattr(self.config, "banded_render_min_height", 0)
+        return (
+            min_height > 0
+            and total_height >= min_height
+            and getattr(self.config, "image_format", "png") == "png"
+        )
+
+    def _render_banded(
+        self,
+        positions: List[Tuple[Section, SectionLayout, int]],
+        total_height: int,
+        subtitle: str,
+        footer_text: str,
+        scale: float,
+        stats: RenderStats,
+    ) -> bytes:
+        """按固定高度的水平条带逐条合成，并直接送入流式 PNG 编码器
+
+        不创建整张画布，也不生成、缓存分区图块：每条带只按排版结果直接画出与之相交的
+        分区标题和卡片，峰值内存只与条带高度有关，解码后的像素与完整合成一致。
+        """
+        width = self._px(self.IMG_WIDTH, scale)
+        band_height = max(16, getattr(self.config, "banded_render_band_height", 256))
+        compose_ms = encode_ms = 0.0
+
+        # 页眉（Logo、标题）与页脚只占很小的区域，先单独绘制，再按条带裁剪贴上
+        start = time.perf_counter()
+        header_bottom = min(
+            self._px(self.TOP_AREA_HEIGHT + self.PADDING, scale), total_height
+        )
+        header = self._background_rows(total_height, 0, header_bottom, scale)
+        self._draw_logo(header, subtitle, scale)
+        footer_top = total_height - min(
+            self._px(self.FOOTER_HEIGHT + self.PADDING, scale), total_height
+        )
+        footer = self._background_rows(total_height, footer_top, total_height, scale)
+        self._draw_footer(footer, footer.height, footer_text, scale)
+        compose_ms += (time.perf_counter() - start) * 1000
+
+        output = io.BytesIO()
+        writer = StreamingPNGWriter(
+            output, width, total_height, self._png_compress_level()
+        )
+        # 与当前条带相交的分区；分区按 y 递增排列，离开条带后即移出
+        live: List[Tuple[int, int, SectionLayout]] = []
+        next_index = 0
+        for top in range(0, total_height, band_height):
+            bottom = min(top + band_height, total_height)
+            start = time.perf_counter()
+            band = self._background_rows(total_height, top, bottom, scale)
+            if top < header_bottom:
+                band.paste(header.crop((0, top, width, min(bottom, header_bottom))))
+            live = [entry for entry in live if entry[1] >= top]
+            while next_index < len(positions) and positions[next_index][2] <= bottom:
+                _, layout, y = positions[next_index]
+                # 卡片贴图比卡片本身多出 1 像素，范围按 +1 计算
+                live.append((y, y + self._px(layout.height, scale) + 1, layout))
+                next_index += 1
+            # 页脚先于图块贴上：最后一张卡片的下边框会伸进页脚区域，需要叠在其上
+            if bottom > footer_top:
+                src_top = max(top, footer_top)
+                band.paste(
+                    footer.crop((0, src_top - footer_top, width, bottom - footer_top)),
+                    (0, src_top - top),
+                )
+            for y, _, layout in live:
+                self._draw_section(band, layout, scale, y - top)
+            encode_start = time.perf_counter()
+            writer.write(band)
+            compose_ms += (encode_start - start) * 1000
+            encode_ms += (time.perf_counter() - encode_start) * 1000
+        start = time.perf_counter()
+        writer.close()
+        data = output.getvalue()
+        encode_ms += (time.perf_counter() - start) * 1000
+
+        # 不保留整张画布，下次渲染无法增量重绘
+        self._last_canvas = None
+        encode_stats = {
+            "format": "png",
+            "width": width,
+            "height": total_height,
+            "bytes": len(data),
+            "encode_ms": round(encode_ms, 2),
+        }
+        stats.update(encode_stats, compose_ms=compose_ms, incremental=False)
+        stats["banded"] = True
+        self.last_encode_stats = encode_stats
+        logger.info(
+            f"帮助图分条带编码完成: png {width}x{total_height}, 条带高度 {band_height}, "
+            f"{len(data) / 1024:.1f} KB, 耗时 {compose_ms + encode_ms:.1f} ms"
+        )
+        return data
+
+    def _background_rows(
+        self, total_height: int, top: int, bottom: int, scale: float = 1.0
+    ) -> Image.Image:
+        return self._gradient_rows(
+            self._px(self.IMG_WIDTH, scale),
             total_height,
+            top,
+            bottom,
             self.COLOR_BACKGROUND_START,
             self.COLOR_BACKGROUND_END,
         )
 
+    def _background(self, total_height: int, scale: float = 1.0) -> Image.Image:
+        return self._background_rows(total_height, 0, total_height, scale)
+
+    def _compose_canvas(
+        self,
+        placements: List[TilePlacement],
+        total_height: int,
+        subtitle: str,
+        footer_text: str,
+        stats: RenderStats | None = None,
+        scale: float = 1.0,
+    ) -> Image.Image:
+        """完整合成：渐变背景 + Logo + 全部分区图块 + 页脚（尺寸均为设备像素）"""
+        # 创建最终图片，直接以渐变背景为底
+        start = time.perf_counter()
+        img = self._background(total_height, scale)
+        if stats is not None:
+            stats["gradient_ms"] += (time.perf_counter() - start) * 1000
+
         # 绘制logo
-        self._draw_logo(img)
+        self._draw_logo(img, subtitle, scale)
 
-        # 绘制卡片
-        self._draw_cards(img, layout_info)
+        # 贴上各分区图块
+        for placement in placements:
+            img.paste(placement.tile, (0, placement.y), placement.tile)
 
-        # 底部版权
-        footer_text = f"AstrBot v{self.config.version}"
-        bbox = draw.textbbox((0, 0), footer_text, font=self.font_footer)
-        fw = bbox[2] - bbox[0]
-        fh = bbox[3] - bbox[1]
-        draw.text(
+        self._draw_footer(img, total_height, footer_text, scale)
+        return img
+
+    def _patch_canvas(
+        self,
+        previous: CanvasState,
+        placements: List[TilePlacement],
+        total_height: int,
+        footer_text: str,
+        scale: float = 1.0,
+    ) -> Image.Image:
+        """在上一张画布的基础上只重绘变化的分区，未变化的分区原样保留"""
+        old = {(key, y) for key, y, _ in previous.placements}
+        new = {(p.key, p.y) for p in placements}
+        dirty = [(y, y + h) for key, y, h in previous.placements if (key, y) not in new]
+        dirty += [(p.y, p.y + p.height) for p in placements if (p.key, p.y) not in old]
+        if not dirty:
+            # 内容完全一致，画布不会被修改，可以直接复用
+            return previous.image
+
+        def is_dirty(top: int, bottom: int) -> bool:
+            return any(top < d_bottom and d_top < bottom for d_top, d_bottom in dirty)
+
+        # 页脚所在区域总是重绘；与脏区相交的分区需要整块恢复背景后重贴，避免重复叠加
+        footer_top = total_height - self._px(self.FOOTER_HEIGHT + self.PADDING, scale)
+        dirty.append((footer_top, total_height))
+        redraw = [p for p in placements if is_dirty(p.y, p.y + p.height)]
+        dirty += [(p.y, p.y + p.height) for p in redraw]
+
+        img = previous.image.copy()
+        for top, bottom in dirty:
+            top, bottom = max(top, 0), min(bottom, total_height)
+            if top < bottom:
+                img.paste(
+                    self._background_rows(total_height, top, bottom, scale), (0, top)
+                )
+        for placement in redraw:
+            img.paste(placement.tile, (0, placement.y), placement.tile)
+        self._draw_footer(img, total_height, footer_text, scale)
+        logger.debug(f"增量重绘帮助图: {len(redraw)}/{len(placements)} 个分区")
+        return img
+
+    def _draw_footer(
+        self,
+        img: Image.Image,
+        total_height: int,
+        footer_text: str,
+        scale: float = 1.0,
+    ):
+        """底部版权"""
+        font = self._font_set(scale).footer
+        footer_height = self._px(self.FOOTER_HEIGHT, scale)
+        _, (fw, fh) = self._get_text_metrics(footer_text, font)
+        self.text_cache.draw(
+            img,
             (
-                self.IMG_WIDTH - fw - self.PADDING,
-                total_height - self.FOOTER_HEIGHT + (self.FOOTER_HEIGHT - fh) // 2,
+                img.width - fw - self._px(self.PADDING, scale),
+                total_height - footer_height + (footer_height - fh) // 2,
             ),
             footer_text,
-            font=self.font_footer,
-            fill=self.COLOR_TEXT_FOOTER,
+            font,
+            self.COLOR_TEXT_FOOTER,
         )
-        # 转成 bytes
+
+    # ---------------- 编码输出 ----------------
+    def _encode_image(self, img: Image.Image) -> Tuple[bytes, RenderStats]:
+        """按配置的格式编码图片，返回图片字节及编码耗时、体积等信息"""
+        image_format = getattr(self.config, "image_format", "png")
+        start = time.perf_counter()
         with io.BytesIO() as output:
-            img.save(output, format="PNG", optimize=True)
-            return output.getvalue()
+            if image_format == "png_palette":
+                # 画面只有少量主题色，量化为调色板后体积和压缩耗时都大幅下降
+                img.quantize(
+                    colors=256,
+                    method=Image.Quantize.FASTOCTREE,
+                    dither=Image.Dither.NONE,
+                ).save(output, format="PNG", compress_level=self._png_compress_level())
+            elif image_format == "webp":
+                img.save(output, format="WEBP", lossless=True, method=2)
+            elif image_format == "jpeg":
+                quality = getattr(self.config, "jpeg_quality", 85)
+                img.save(output, format="JPEG", quality=quality, optimize=False)
+            else:
+                if image_format != "png":
+                    logger.warning(f"未知的图片格式 '{image_format}'，已改用 PNG")
+                    image_format = "png"
+                compress_level = self._png_compress_level()
+                # 压缩等级 9 时额外启用 optimize，与旧版输出一致
+                img.save(
+                    output,
+                    format="PNG",
+                    compress_level=compress_level,
+                    optimize=compress_level >= 9,
+                )
+            data = output.getvalue()
+        encode_ms = (time.perf_counter() - start) * 1000
+        encode_stats = {
+            "format": image_format,
+            "width": img.width,
+            "height": img.height,
+            "bytes": len(data),
+            "encode_ms": round(encode_ms, 2),
+        }
+        logger.info(
+            f"帮助图编码完成: {image_format} {img.width}x{img.height}, "
+            f"{len(data) / 1024:.1f} KB, 耗时 {encode_ms:.1f} ms"
+        )
+        return data, encode_stats
+
+    def _png_compress_level(self) -> int:
+        level = getattr(self.config, "png_compress_level", 6)
+        return min(max(int(level), 0), 9)
@@ -1,42 +1,536 @@
+import asyncio
 import collections
-from typing import Dict, List, Optional
+import os
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 from astrbot.api.event import filter, AstrMessageEvent
-from astrbot.api.star import Context, Star, register
+from astrbot.api.star import Context, Star, StarTools, register
 from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.message.components import Image
-from astrbot.core.star.filter.command import CommandFilter
-from astrbot.core.star.filter.command_group import CommandGroupFilter
-from astrbot.core.star.star_handler import star_handlers_registry, StarHandlerMetadata
+from astrbot.core.star.star_handler import star_handlers_registry
 
-from .draw import AstrBotHelpDrawer
+try:
+    # 会话级插件启停，较旧的 AstrBot 版本没有该模块
+    from astrbot.core.star.session_plugin_manager import SessionPluginManager
+except ImportError:
+    SessionPluginManager = None
+
+from .cache import HelpImageCache, HelpImageFileStore, make_fingerprint
+from .command_index import HandlerIndex
+from .command_model import CommandRecord, PluginCommands
+from .command_table import CommandTable, HelpVariant
+from .draw import AstrBotHelpDrawer, Section
+from .metrics import HelpMetrics
+from .prewarm import HelpPrewarmer
+from .renderer import HelpRenderService
+from .search_index import CommandSearchIndex
+from .text_render import TextHelpRenderer
 
 
 @register(
     "astrbot_plugin_help", "tinker", "查看所有命令，包括插件，返回一张帮助图片", "1.1.3"
 )
 class AstrBotPluginHelp(Star):
+    # 从绘图器的渲染统计中收集的字段
+    RENDER_STAT_KEYS = (
+        "layout_ms",
+        "cards_ms",
+        "gradient_ms",
+        "compose_ms",
+        "encode_ms",
+        "width",
+        "height",
+        "format",
+        "merged",
+        "incremental",
+        "banded",
+        "scale",
+    )
+    # 快照派生数据的条目上限：键中含有用户输入的筛选词、页码，需要限制总量
+    SNAPSHOT_DERIVED_SIZE = 128
+
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.config = config
         self.drawer = AstrBotHelpDrawer(config)
+        # module_path -> 命令 的索引，避免每次请求都做 插件 × 处理器 的全量扫描
+        self.handler_index = HandlerIndex()
+        # 命令快照及其版本号，插件集合未变化时热路径不扫描注册表
+        self._commands_snapshot: PluginCommands = {}
+        self._snapshot_generation: Optional[Tuple] = None
+        self._snapshot_derived: collections.OrderedDict[Tuple, Any] = (
+            collections.OrderedDict()
+        )
+        # 渲染结果缓存，命令与相关配置不变时直接复用图片
+        disk_dir = None
+        if getattr(self.config, "disk_cache", False):
+            disk_dir = os.path.join(
+                StarTools.get_data_dir("astrbot_plugin_help"), "image_cache"
+            )
+        self.image_cache = HelpImageCache(
+            max_items=getattr(self.config, "cache_size", 8),
+            disk_dir=disk_dir,
+        )
+        # 文件投递：图片按内容哈希落盘，发送时只传路径，相同的图片只写一次
+        self.file_store: Optional[HelpImageFileStore] = None
+        if getattr(self.config, "image_delivery", "bytes") == "file":
+            try:
+                self.file_store = HelpImageFileStore(
+                    os.path.join(
+                        StarTools.get_data_dir("astrbot_plugin_help"), "images"
+                    ),
+                    max_bytes=int(getattr(self.config, "image_file_max_mb", 64)) << 20,
+                    max_age=getattr(self.config, "image_file_max_age_hours", 72) * 3600,
+                )
+                self.file_store.cleanup()
+            except OSError as e:
+                logger.warning(f"创建帮助图目录失败，改为直接发送图片: {e}")
+        # 渲染放到独立的线程池/进程池，避免阻塞事件循环
+        self.render_service = HelpRenderService(
+            self.drawer,
+            config,
+            backend=getattr(self.config, "render_backend", "thread"),
+            max_workers=getattr(self.config, "render_workers", 1),
+        )
+        self._pool_warmup: Optional[asyncio.Task] = None
+        self._warm_render_pool()
+        # 文本/Markdown 输出，用于发图慢或受限的平台
+        self.text_renderer = TextHelpRenderer(
+            chunk_size=getattr(self.config, "text_chunk_size", 1800)
+        )
+        # 运行指标，关闭时几乎没有开销
+        self.metrics = HelpMetrics(
+            enabled=getattr(self.config, "metrics_enabled", False),
+            log_records=getattr(self.config, "metrics_log", False),
+        )
+        # 后台预热：启动时及插件变化后提前渲染好帮助图
+        self.prewarmer: Optional[HelpPrewarmer] = None
+        if getattr(self.config, "prewarm", False):
+            self.prewarmer = HelpPrewarmer(
+                self._registry_generation,
+                self._prewarm,
+                debounce=getattr(self.config, "prewarm_debounce", 5),
+                check_interval=getattr(self.config, "prewarm_check_interval", 30),
+            )
+            # 插件热重载时事件循环已在运行，可以直接启动；否则等 AstrBot 加载完成
+            self.prewarmer.start()
 
     @filter.command("helps", alias={"帮助", "菜单", "功能"})
     async def get_help(self, event: AstrMessageEvent):
-        """获取插件帮助信息"""
+        """获取插件帮助信息，/helps 页码 查看指定页，/helps 插件名 查看指定插件，/helps search 关键字 搜索指令"""
+        arg = self._get_command_arg(event)
+        if arg == "stats" and event.is_admin():
+            yield event.plain_result(self.metrics.summary(self._extra_cache_ratios()))
+            return
+        # 统计关闭时 record 为 None，各处的计时都会跳过
+        record: Optional[Dict[str, Any]] = {} if self.metrics.enabled else None
+        start = time.perf_counter()
         help_msg = self.get_all_commands()
+        if record is not None:
+            record["collect_ms"] = (time.perf_counter() - start) * 1000
+        mode = self._output_mode(event)
         if not help_msg:
+            self._record_request(record, start, mode=mode, empty=True)
             yield event.plain_result("没有找到任何插件或命令")
             return
-        image = self.drawer.draw_help_image(help_msg)
-        yield event.chain_result([Image.fromBytes(image)])
 
-    def get_all_commands(self) -> Dict[str, List[str]]:
-        """获取所有其他插件及其命令列表, 格式为 {plugin_name: [command#desc]}"""
-        # 使用 defaultdict 可以方便地向列表中添加元素
-        plugin_commands: Dict[str, List[str]] = collections.defaultdict(list)
+        # 调用者可见的命令（按权限、会话启用的插件过滤），可见范围相同的调用者共用缓存
+        variant = self._help_variant(event, help_msg)
+        keyword = self._search_keyword(arg)
+        if keyword is not None:
+            reply = self._search_reply(help_msg, keyword, variant)
+            self._record_request(record, start, mode="search", query=keyword)
+            yield event.plain_result(reply)
+            return
+
+        page = None
+        query = None
+        if arg.isdecimal():
+            page = int(arg)
+        elif arg:
+            query = arg
+        elif getattr(self.config, "paginate_by_default", False):
+            page = 1
+
+        if mode != "image":
+            chunks = self._render_text(
+                help_msg, page, query, mode == "markdown", variant
+            )
+            self._record_request(record, start, mode=mode, page=page, query=query)
+            for chunk in chunks:
+                yield event.plain_result(chunk)
+            return
+
+        image, cache_key, error = await self._render_help(
+            help_msg, page, query, record, variant
+        )
+        self._record_request(record, start, mode=mode, page=page, query=query)
+        if image is None:
+            yield event.plain_result(error)
+            return
+        yield event.chain_result([self._image_component(cache_key, image)])
+
+    async def _render_help(
+        self,
+        help_msg: PluginCommands,
+        page: Optional[int],
+        query: Optional[str],
+        record: Optional[Dict[str, Any]] = None,
+        variant: Optional[HelpVariant] = None,
+    ) -> Tuple[Optional[bytes], str, str]:
+        """取得（或渲染）指定页/筛选条件的帮助图，返回 (图片, 缓存键, 提示语)，失败时图片为 None
+
+        record 不为 None 时会写入各阶段耗时、缓存命中情况与输出信息；
+        variant 为调用者可见的命令集合，为 None 时不做过滤。
+        """
+        start = time.perf_counter()
+        sections, subtitle, error = self._select_sections(
+            help_msg, page, query, variant
+        )
+        if record is not None:
+            record["sections_ms"] = (time.perf_counter() - start) * 1000
+        if not sections:
+            return None, "", error
+
+        fingerprint_variant = f"page={page};query={query}"
+        if variant is not None and variant.signature:
+            fingerprint_variant += f";visible={variant.signature}"
+        cache_key = self._snapshot_value(
+            ("fingerprint", fingerprint_variant),
+            lambda: make_fingerprint(
+                help_msg, self.config, variant=fingerprint_variant
+            ),
+        )
+        image = self.image_cache.get(cache_key)
+        self.metrics.hit("图片缓存", image is not None)
+        if image is None:
+            start = time.perf_counter()
+            image, stats = await self.render_service.render(
+                cache_key, sections, subtitle
+            )
+            self.image_cache.put(cache_key, image)
+            if record is not None:
+                record["render_ms"] = (time.perf_counter() - start) * 1000
+                self._record_render_stats(record, stats)
+        if record is not None:
+            record["cache"] = "miss" if "render_ms" in record else "hit"
+            record["bytes"] = len(image)
+        return image, cache_key, ""
+
+    def _image_component(self, cache_key: str, image: bytes) -> Image:
+        """文件投递模式下发送落盘后的文件路径，否则直接发送图片字节"""
+        if self.file_store is not None:
+            try:
+                return Image.fromFileSystem(
+                    self.file_store.path_for(
+                        cache_key, image, getattr(self.config, "image_format", "png")
+                    )
+                )
+            except OSError as e:
+                logger.warning(f"帮助图落盘失败，改为直接发送: {e}")
+        return Image.fromBytes(image)
+
+    @staticmethod
+    def _search_keyword(arg: str) -> Optional[str]:
+        """/helps search 关键字 或 /helps 搜索 关键字，不是搜索子命令时返回 None"""
+        parts = arg.split(maxsplit=1)
+        if not parts or parts[0].lower() not in ("search", "搜索"):
+            return None
+        return parts[1] if len(parts) > 1 else ""
+
+    def _search_reply(
+        self,
+        help_msg: PluginCommands,
+        keyword: str,
+        variant: Optional[HelpVariant] = None,
+    ) -> str:
+        """在命令索引中搜索，直接回复文本，不经过图片渲染"""
+        if not keyword:
+            return "用法：/helps search 关键字，可搜索指令名、别名、描述和插件名"
+        start = time.perf_counter()
+        # 索引随命令快照一起缓存，插件集合变化时才重建
+        index = self._snapshot_value(
+            ("search_index",),
+            lambda: CommandSearchIndex(self.drawer.iter_records(help_msg)),
+        )
+        limit = getattr(self.config, "search_limit", 20)
+        records, total = index.search(
+            keyword, limit, self._record_filter(help_msg, variant)
+        )
+        self.metrics.observe("search", (time.perf_counter() - start) * 1000)
+        if not records:
+            return f"没有找到与“{keyword}”相关的指令"
+        lines = [f"与“{keyword}”相关的指令（共 {total} 条）："]
+        for record in records:
+            line = record.name
+            if record.aliases:
+                line += f"（别名：{'、'.join(record.aliases)}）"
+            if record.description:
+                line += f" - {record.description}"
+            lines.append(f"{line} [{record.plugin}]")
+        if total > len(records):
+            lines.append(f"……还有 {total - len(records)} 条，请使用更具体的关键字")
+        return "\n".join(lines)
+
+    def _select_sections(
+        self,
+        help_msg: PluginCommands,
+        page: Optional[int],
+        query: Optional[str],
+        variant: Optional[HelpVariant] = None,
+    ) -> Tuple[List[Section], Optional[str], str]:
+        """按筛选条件和页码取出分区，返回 (分区, 副标题, 提示语)；无结果时分区为空"""
+        signature = variant.signature if variant is not None else ""
+        sections = self._snapshot_value(
+            ("sections", query, signature),
+            lambda: self.drawer.parse_sections(
+                help_msg, query, self._record_filter(help_msg, variant)
+            ),
+        )
+        if not sections:
+            return [], None, f"没有找到与“{query}”相关的插件或命令"
+        if page is None:
+            return sections, None, ""
+        sections, page_count = self.drawer.paginate_sections(
+            sections, page, getattr(self.config, "page_size", 6)
+        )
+        if not sections:
+            return [], None, f"页码超出范围，共 {page_count} 页"
+        return (
+            sections,
+            f"{self.drawer.DEFAULT_SUBTITLE} · 第 {page}/{page_count} 页",
+            "",
+        )
+
+    def _render_text(
+        self,
+        help_msg: PluginCommands,
+        page: Optional[int],
+        query: Optional[str],
+        markdown: bool,
+        variant: Optional[HelpVariant] = None,
+    ) -> List[str]:
+        """文本/Markdown 模式的帮助，结果随命令快照一起缓存"""
+
+        def build() -> List[str]:
+            sections, subtitle, error = self._select_sections(
+                help_msg, page, query, variant
+            )
+            if not sections:
+                return [error]
+            return self.text_renderer.render(
+                sections,
+                markdown=markdown,
+                title=subtitle or self.drawer.DEFAULT_SUBTITLE,
+                footer=f"AstrBot v{getattr(self.config, 'version', '')}",
+            )
+
+        signature = variant.signature if variant is not None else ""
+        return self._snapshot_value(("text", markdown, page, query, signature), build)
+
+    def _command_table(self, help_msg: PluginCommands) -> CommandTable:
+        """帮助中会出现的全部命令的编号表，随命令快照一起缓存"""
+        return self._snapshot_value(
+            ("command_table",),
+            lambda: CommandTable(self.drawer.iter_records(help_msg)),
+        )
+
+    def _help_variant(
+        self, event: AstrMessageEvent, help_msg: PluginCommands
+    ) -> Optional[HelpVariant]:
+        """计算调用者可见的命令集合；两项过滤都关闭时返回 None"""
+        hide_admin = getattr(self.config, "hide_admin_cmds", True)
+        session_aware = getattr(self.config, "session_aware_help", True)
+        if not hide_admin and not session_aware:
+            return None
+        is_admin = not hide_admin or event.is_admin()
+        enabled_names = getattr(event, "plugins_name", None)
+        session_id = event.unified_msg_origin
+
+        def plugin_enabled(plugin: str) -> bool:
+            if not session_aware:
+                return True
+            # 平台级的插件启用列表，None 表示全部启用
+            if enabled_names is not None and plugin not in enabled_names:
+                return False
+            if SessionPluginManager is None:
+                return True
+            try:
+                return SessionPluginManager.is_plugin_enabled_for_session(
+                    session_id, plugin
+                )
+            except Exception as e:
+                logger.debug(f"读取会话插件设置失败: {e}")
+                return True
+
+        return self._command_table(help_msg).variant(is_admin, plugin_enabled)
+
+    def _record_filter(
+        self, help_msg: PluginCommands, variant: Optional[HelpVariant]
+    ) -> Optional[Callable[[CommandRecord], bool]]:
+        """可见范围对应的逐条过滤函数，全部可见时返回 None"""
+        if variant is None or not variant.signature:
+            return None
+        return self._command_table(help_msg).allows(variant)
+
+    def _output_mode(self, event: AstrMessageEvent) -> str:
+        """当前会话使用的输出模式：image / text / markdown"""
+        try:
+            platform = event.get_platform_name()
+        except Exception:
+            platform = None
+        return TextHelpRenderer.resolve_mode(
+            getattr(self.config, "output_mode", "image"),
+            getattr(self.config, "platform_output_modes", []),
+            platform,
+        )
+
+    def _record_request(
+        self, record: Optional[Dict[str, Any]], start: float, **fields: Any
+    ) -> None:
+        """补上输出模式等信息与总耗时后提交本次请求的记录；统计关闭时 record 为 None"""
+        if record is None:
+            return
+        record.update(fields)
+        record["total_ms"] = (time.perf_counter() - start) * 1000
+        self.metrics.record_request(record)
+
+    def _record_render_stats(
+        self, record: Dict[str, Any], stats: Dict[str, Any]
+    ) -> None:
+        """把绘图器返回的渲染统计并入请求记录"""
+        for key in self.RENDER_STAT_KEYS:
+            if key in stats:
+                record[key] = stats[key]
+        self.metrics.hit("合并渲染", stats.get("merged", False))
+        self.metrics.hit("分区图块", True, stats.get("tile_hits", 0))
+        self.metrics.hit("分区图块", False, stats.get("tile_misses", 0))
+
+    def _extra_cache_ratios(self) -> Dict[str, Tuple[int, int]]:
+        """只能在本进程内读取的缓存命中情况（进程池渲染时不可用）"""
+        if self.render_service.backend != "thread":
+            return {}
+        text_stats = self.drawer.text_cache.stats()
+        return {"文字缓存": (text_stats["hits"], text_stats["misses"])}
+
+    async def _prewarm(self) -> None:
+        """后台预热：渲染并缓存不带参数的 /helps 会返回的图片
+
+        除完整版本外，还会预热普通成员（未禁用任何插件的会话）看到的版本，
+        存在管理员指令时它与完整版本的缓存键不同。
+        """
+        help_msg = self.get_all_commands()
+        if not help_msg:
+            return
+        page = 1 if getattr(self.config, "paginate_by_default", False) else None
+        await self._render_help(help_msg, page, None)
+        if getattr(self.config, "hide_admin_cmds", True):
+            variant = self._command_table(help_msg).variant(False, lambda _: True)
+            if variant.signature:
+                await self._render_help(help_msg, page, None, variant=variant)
+
+    @staticmethod
+    def _get_command_arg(event: AstrMessageEvent) -> str:
+        """取出指令名之后的参数部分"""
+        parts = event.message_str.strip().split(maxsplit=1)
+        return parts[1].strip() if len(parts) > 1 else ""
+
+    def _warm_render_pool(self) -> None:
+        """进程池模式下在后台拉起全部 worker；事件循环未运行时等 AstrBot 加载完成再启动"""
+        if self.render_service.backend != "process" or self._pool_warmup is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pool_warmup = loop.create_task(self.render_service.warm_up())
+
+    async def terminate(self):
+        """插件卸载时停止预热任务并关闭渲染线程池/进程池"""
+        if self.prewarmer is not None:
+            self.prewarmer.stop()
+        if self._pool_warmup is not None and not self._pool_warmup.done():
+            self._pool_warmup.cancel()
+        await self.render_service.aclose()
+
+    @filter.on_astrbot_loaded()
+    async def on_astrbot_loaded(self):
+        """AstrBot 启动完成后插件集合已稳定，丢弃启动过程中可能采集到的快照"""
+        self.mark_dirty()
+        self._warm_render_pool()
+        if self.prewarmer is not None and self.prewarmer.start():
+            self.prewarmer.schedule()
+
+    def mark_dirty(self) -> None:
+        """标记命令快照失效，下次请求时重新采集"""
+        self._snapshot_generation = None
+
+    def _registry_generation(self) -> Tuple:
+        """插件集合的廉价版本号：处理器数量 + 各插件实例与激活状态
+
+        插件加载、卸载、重载或启停都会改变其中某一项，未变化时无需扫描注册表。
+        这里保存实例的弱引用而不是 id()：旧实例被释放后其地址可能被重载后的新实例
+        复用，只比较 id 会把重载误判为未变化；失效的弱引用与任何存活实例的弱引用
+        都不相等，同时又不会让已卸载的插件实例一直驻留内存。
+        """
+        return (
+            len(star_handlers_registry),
+            tuple(
+                (self._instance_ref(getattr(star, "star_cls", None)), star.activated)
+                for star in self.context.get_all_stars()
+            ),
+        )
+
+    @staticmethod
+    def _instance_ref(instance: Any) -> Any:
+        if instance is None:
+            return None
+        try:
+            return weakref.ref(instance)
+        except TypeError:
+            # 不支持弱引用的对象只能退回 id()
+            return id(instance)
+
+    def _snapshot_value(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        """基于当前命令快照的派生数据（分区、指纹等），快照失效时一并清空
+
+        按 LRU 保留最多 SNAPSHOT_DERIVED_SIZE 条，随意输入的筛选词不会让它无限增长。
+        """
+        derived = self._snapshot_derived
+        if key in derived:
+            derived.move_to_end(key)
+            return derived[key]
+        value = derived[key] = factory()
+        while len(derived) > self.SNAPSHOT_DERIVED_SIZE:
+            derived.popitem(last=False)
+        return value
+
+    def get_all_commands(self) -> PluginCommands:
+        """获取所有其他插件及其命令列表, 格式为 {plugin_name: [CommandRecord]}
+
+        插件集合未变化时直接返回上次采集的快照。
+        """
+        try:
+            generation = self._registry_generation()
+        except Exception as e:
+            logger.error(f"获取插件列表失败: {e}")
+            return {}
+        if generation != self._snapshot_generation:
+            self._commands_snapshot = self._collect_commands()
+            self._snapshot_generation = generation
+            self._snapshot_derived.clear()
+        return self._commands_snapshot
+
+    def _collect_commands(self) -> PluginCommands:
+        """从插件元数据与处理器索引中采集命令"""
+        # 使用 defaultdict 可以方便地向插件下添加命令，值为 dict 用于保序去重
+        plugin_commands: Dict[str, Dict[Tuple[str, Optional[str]], CommandRecord]] = (
+            collections.defaultdict(dict)
+        )
         try:
             # 获取所有插件的元数据，并且去掉未激活的
             all_stars_metadata = self.context.get_all_stars()
@@ -47,6 +541,8 @@ class AstrBotPluginHelp(Star):
         if not all_stars_metadata:
             logger.warning("没有找到任何插件")
             return {}  # 没有插件时返回空字典
+        # 与处理器注册表做差量同步，只处理新增/移除的处理器
+        self.handler_index.refresh(star_handlers_registry)
         for star in all_stars_metadata:
             plugin_name = getattr(star, "name", "未知插件")
             plugin_instance = getattr(star, "star_cls", None)
@@ -73,36 +569,10 @@ class AstrBotPluginHelp(Star):
             # 检查插件实例是否是当前插件的实例 (排除自身)
             if plugin_instance is self:
                 continue
-            # 遍历所有注册的处理器
-            for handler in star_handlers_registry:
-                # 确保处理器元数据有效且类型正确 (虽然原始代码有 assert，这里加个检查更安全)
-                if not isinstance(handler, StarHandlerMetadata):
-                    continue
-                # 检查此处理器是否属于当前遍历的插件 (通过模块路径匹配)
-                if handler.handler_module_path != module_path:
-                    continue
-                command_name: Optional[str] = None
-                description: Optional[str] = handler.desc  # 获取描述信息
-                # 遍历处理器的过滤器，查找命令或命令组
-                for filter_ in handler.event_filters:
-                    if isinstance(filter_, CommandFilter):
-                        command_name = filter_.command_name
-                        break  # 找到一个命令即可，跳出过滤器循环
-                    elif isinstance(filter_, CommandGroupFilter):
-                        command_name = filter_.group_name
-                        break  # 找到一个命令组即可
-                # 如果找到了命令或命令组名称
-                if command_name:
-                    # 格式化字符串
-                    if description:
-                        formatted_command = f"{command_name}#{description}"
-                    else:
-                        # 如果没有描述，就不加 # 和后面的部分
-                        formatted_command = command_name
-
-                    # 将格式化后的命令添加到对应插件的列表中
-                    # 使用 set 来避免因别名等原因导致的完全重复项（如 "/cmd1#desc" 多次出现）
-                    # 如果允许重复（例如不同handler但命令和描述相同），则直接 append
-                    if formatted_command not in plugin_commands[plugin_name]:
-                        plugin_commands[plugin_name].append(formatted_command)
-        return dict(plugin_commands)
+            # 通过索引直接取出该模块下的命令，无需遍历整个注册表
+            for record in self.handler_index.commands_for(module_path, plugin_name):
+                # 使用 dict 记录已添加的命令，避免同名插件合并时出现重复项
+                plugin_commands[plugin_name].setdefault(
+                    (record.name, record.description), record
+                )
+        return {name: list(cmds.values()) for name, cmds in plugin_commands.items()}
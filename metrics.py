@@ -0,0 +1,133 @@
+import bisect
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图（毫秒），内存占用恒定"""
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        # 最后一个桶收纳超过最大边界的样本
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """按分桶上界估算分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                # 分桶上界不会超过实际观测到的最大值
+                return (
+                    min(self.BUCKETS_MS[i], self.max)
+                    if i < len(self.BUCKETS_MS)
+                    else self.max
+                )
+        return self.max
+
+
+class HelpMetrics:
+    """帮助请求的运行指标：各阶段耗时直方图、缓存命中率与输出尺寸
+
+    未启用时所有记录方法立即返回，几乎没有开销。
+    """
+
+    def __init__(self, enabled: bool = False, log_records: bool = False) -> None:
+        self.enabled = enabled
+        self.log_records = log_records
+        self.started_at = time.time()
+        self.requests = 0
+        # 输出模式（image/text/markdown/search）-> 请求数
+        self.modes: Dict[str, int] = {}
+        self.stages: Dict[str, LatencyHistogram] = {}
+        # 名称 -> (命中, 未命中)
+        self.ratios: Dict[str, List[int]] = {}
+        self.last_output: Dict[str, Any] = {}
+
+    def observe(self, stage: str, ms: float) -> None:
+        if not self.enabled:
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.observe(ms)
+
+    def hit(self, name: str, hit: bool, count: int = 1) -> None:
+        if not self.enabled or count <= 0:
+            return
+        counter = self.ratios.setdefault(name, [0, 0])
+        counter[0 if hit else 1] += count
+
+    def record_request(self, record: Dict[str, Any]) -> None:
+        """记录一次请求的汇总信息，并按需输出为结构化日志"""
+        if not self.enabled:
+            return
+        self.requests += 1
+        mode = record.get("mode")
+        if mode:
+            self.modes[mode] = self.modes.get(mode, 0) + 1
+        for key, value in record.items():
+            if key.endswith("_ms") and isinstance(value, (int, float)):
+                self.observe(key[:-3], value)
+        # 命中缓存的请求没有尺寸信息，只在真正渲染时更新
+        if "width" in record:
+            self.last_output = {
+                key: record[key]
+                for key in ("width", "height", "bytes", "format")
+                if key in record
+            }
+        if self.log_records:
+            logger.info(
+                "help_metrics "
+                + json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            )
+
+    def summary(self, extra_ratios: Optional[Dict[str, Tuple[int, int]]] = None) -> str:
+        """生成 /helps stats 的文本报告"""
+        if not self.enabled:
+            return "帮助图统计未开启，请在插件配置中打开 metrics_enabled"
+        since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at))
+        lines = [f"帮助图统计（自 {since} 起，共 {self.requests} 次请求）"]
+        if self.modes:
+            lines.append(
+                "输出模式: "
+                + "，".join(f"{mode} {count}" for mode, count in self.modes.items())
+            )
+        ratios = {name: tuple(v) for name, v in self.ratios.items()}
+        ratios.update(extra_ratios or {})
+        for name, (hits, misses) in ratios.items():
+            total = hits + misses
+            rate = f"{hits / total:.1%}" if total else "-"
+            lines.append(f"{name}命中率: {rate} ({hits}/{total})")
+        if self.stages:
+            lines.append("阶段耗时(ms): 次数 / 平均 / p50 / p95 / 最大")
+            for stage, h in self.stages.items():
+                lines.append(
+                    f"  {stage}: {h.count} / {h.total / h.count:.1f} / "
+                    f"{h.quantile(0.5):.1f} / {h.quantile(0.95):.1f} / {h.max:.1f}"
+                )
+        if self.last_output:
+            out = self.last_output
+            lines.append(
+                f"最近输出: {out.get('width')}x{out.get('height')} "
+                f"{out.get('format', '')} {out.get('bytes', 0) / 1024:.1f} KB"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+from astrbot.api import logger
+
+
+class HelpPrewarmer:
+    """在后台预先渲染帮助图
+
+    启动后立即预热一次，之后定期检查插件集合的版本号，变化时再预热；
+    连续的变化会被防抖合并，两次预热之间至少间隔 debounce 秒。
+    """
+
+    def __init__(
+        self,
+        generation: Callable[[], Hashable],
+        warm: Callable[[], Awaitable[None]],
+        debounce: float = 5.0,
+        check_interval: float = 30.0,
+    ) -> None:
+        self._generation = generation
+        self._warm = warm
+        self.debounce = max(0.0, debounce)
+        self.check_interval = max(1.0, check_interval)
+        self._warmed_generation: Optional[Hashable] = None
+        self._last_warm_at = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    def start(self) -> bool:
+        """启动预热与变化检测，需要在事件循环中调用；已启动时忽略"""
+        if self._watcher is not None:
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._watcher = loop.create_task(self._watch())
+        self.schedule(delay=0)
+        return True
+
+    def schedule(self, delay: Optional[float] = None) -> None:
+        """安排一次预热；在等待期间再次调用会重新计时（防抖）"""
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        self._pending = asyncio.get_running_loop().create_task(
+            self._warm_after(self.debounce if delay is None else delay)
+        )
+
+    async def _warm_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # 限速：距离上次预热不足 debounce 秒时继续等待
+        wait = self._last_warm_at + self.debounce - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        generation = self._generation()
+        if generation == self._warmed_generation:
+            return
+        self._last_warm_at = time.monotonic()
+        start = time.perf_counter()
+        try:
+            await self._warm()
+        except Exception as e:
+            logger.warning(f"预热帮助图失败: {e}")
+            return
+        self._warmed_generation = generation
+        logger.debug(
+            f"帮助图预热完成，耗时 {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                changed = self._generation() != self._warmed_generation
+            except Exception as e:
+                logger.debug(f"检测插件变化失败: {e}")
+                continue
+            if changed and (self._pending is None or self._pending.done()):
+                self.schedule()
+
+    def stop(self) -> None:
+        for task in (self._pending, self._watcher):
+            if task is not None and not task.done():
+                task.cancel()
+        self._pending = None
+        self._watcher = None
@@ -0,0 +1,189 @@
+import asyncio
+import marshal
+import multiprocessing
+import types
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+from .draw import AstrBotHelpDrawer, RenderStats, Section
+
+# 进程池 worker 内常驻的绘图器，由 initializer 在进程启动时创建（字体、Logo 已加载）
+_worker_drawer: Optional[AstrBotHelpDrawer] = None
+
+
+def _init_worker(config_items: Dict[str, Any]) -> None:
+    """进程池 initializer：进程启动时预先创建绘图器"""
+    global _worker_drawer
+    _worker_drawer = AstrBotHelpDrawer(types.SimpleNamespace(**config_items))
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """子进程的启动方式：不使用 fork
+
+    AstrBot 主进程里运行着事件循环和多个线程，fork 会把其他线程持有的锁原样复制到
+    子进程中，有死锁风险（Python 3.12 起也会给出 DeprecationWarning）。优先使用
+    forkserver（由单线程的服务进程 fork 出 worker），不支持的平台退回 spawn。
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _worker_ready() -> bool:
+    """空任务，用于在启动时把进程池拉满"""
+    return _worker_drawer is not None
+
+
+def pack_sections(sections: List[Section]) -> bytes:
+    """把分区序列化为紧凑的 marshal 字节串，跨进程传输比 pickle 列表更小更快"""
+    return marshal.dumps(
+        tuple((name, tuple(tuple(cmd) for cmd in cmds)) for name, cmds in sections)
+    )
+
+
+def unpack_sections(payload: bytes) -> List[Section]:
+    return [(name, list(cmds)) for name, cmds in marshal.loads(payload)]
+
+
+def _render_in_worker(
+    payload: bytes, subtitle: Optional[str]
+) -> Tuple[bytes, RenderStats]:
+    """进程池中的渲染入口，必须是模块级函数才能被 pickle"""
+    return _worker_drawer.render_sections(unpack_sections(payload), subtitle)
+
+
+class HelpRenderService:
+    """在独立的线程池/进程池中渲染帮助图，并合并相同指纹的并发请求"""
+
+    BACKENDS = ("thread", "process")
+
+    def __init__(
+        self,
+        drawer: AstrBotHelpDrawer,
+        config: Any,
+        backend: str = "thread",
+        max_workers: int = 1,
+    ) -> None:
+        if backend not in self.BACKENDS:
+            logger.warning(f"未知的渲染后端 '{backend}'，已改用线程池")
+            backend = "thread"
+        self.drawer = drawer
+        self.config = config
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[Executor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.backend == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=_mp_context(),
+                    initializer=_init_worker,
+                    initargs=(self._config_items(),),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="help_render"
+                )
+        return self._executor
+
+    def _config_items(self) -> Dict[str, Any]:
+        """把配置拍平成普通字典，便于传给子进程"""
+        items = dict(self.config)
+        items.setdefault("version", getattr(self.config, "version", None))
+        return items
+
+    async def warm_up(self) -> None:
+        """进程池模式下提前启动全部 worker，首个请求无需等待进程启动和字体加载"""
+        if self.backend != "process":
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            # 同时提交 max_workers 个任务，进程池会按需拉起同样数量的进程
+            ready = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, _worker_ready)
+                    for _ in range(self.max_workers)
+                )
+            )
+        except Exception as e:
+            logger.warning(f"渲染进程池预热失败: {e}")
+            return
+        logger.debug(f"渲染进程池已就绪: {sum(ready)}/{self.max_workers}")
+
+    async def render(
+        self, key: str, sections: List[Section], subtitle: Optional[str] = None
+    ) -> Tuple[bytes, RenderStats]:
+        """渲染帮助图；同一指纹正在渲染时直接等待已有的任务
+
+        返回 (图片字节, 渲染统计)，统计中的 merged 表示本次请求是否复用了他人的渲染。
+        """
+        future = self._inflight.get(key)
+        merged = future is not None
+        if future is None:
+            future = asyncio.ensure_future(self._render_with_retry(sections, subtitle))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 某个请求被取消时不影响其他等待同一结果的请求
+        data, stats = await asyncio.shield(future)
+        return data, {**stats, "merged": merged}
+
+    async def _render_with_retry(
+        self, sections: List[Section], subtitle: Optional[str]
+    ) -> Tuple[bytes, RenderStats]:
+        """worker 异常退出（如内存不足被杀）时用重建的进程池重试一次"""
+        try:
+            return await self._submit(sections, subtitle)
+        except BrokenProcessPool as e:
+            logger.warning(f"渲染进程异常退出，已重建进程池并重试: {e}")
+        return await self._submit(sections, subtitle)
+
+    async def _submit(
+        self, sections: List[Section], subtitle: Optional[str]
+    ) -> Tuple[bytes, RenderStats]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            if self.backend == "process":
+                return await loop.run_in_executor(
+                    executor, _render_in_worker, pack_sections(sections), subtitle
+                )
+            return await loop.run_in_executor(
+                executor, self.drawer.render_sections, sections, subtitle
+            )
+        except BrokenProcessPool:
+            # 进程池一旦损坏就无法再提交任务，丢弃后下次会重建
+            self._discard_executor(executor)
+            raise
+
+    def _discard_executor(self, executor: Executor) -> None:
+        """丢弃已损坏的进程池；并发请求可能已经换上了新池，此时不再重复丢弃"""
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """关闭并等待 worker 退出；进程池超时未退出时强制结束子进程"""
+        executor, self._executor = self._executor, None
+        self._inflight.clear()
+        if executor is None:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            if self.backend != "process":
+                # 线程无法强制结束，正在进行的渲染完成后线程会自行退出
+                return
+            logger.warning("渲染进程池未能按时退出，已强制结束")
+            # 标准库没有公开的强制结束接口，只能访问内部的进程表
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
@@ -0,0 +1,102 @@
+import collections
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .command_model import CommandRecord
+
+
+class CommandSearchIndex:
+    """命令名、别名、描述、插件名的字符 n-gram 倒排索引
+
+    按字符切分而不是按词切分，中文无需分词；查询时先用 n-gram 的倒排表求交集得到
+    候选，再做一次子串校验，因此结果与逐条子串匹配一致。
+    """
+
+    # 字段权重：命中命令名的排在最前
+    FIELD_WEIGHTS = (("name", 8), ("aliases", 4), ("description", 2), ("plugin", 1))
+
+    def __init__(self, records: Iterable[CommandRecord] = (), n: int = 2) -> None:
+        self.n = max(1, n)
+        self.records: List[CommandRecord] = []
+        # 每条记录各字段的小写文本，用于子串校验和打分
+        self._fields: List[Tuple[str, ...]] = []
+        self._postings: Dict[str, Set[int]] = collections.defaultdict(set)
+        for record in records:
+            self.add(record)
+
+    def _grams(self, text: str) -> Set[str]:
+        """文本的全部 1..n 元字符片段，短查询也能直接命中倒排表"""
+        grams = set()
+        for size in range(1, self.n + 1):
+            grams.update(text[i : i + size] for i in range(len(text) - size + 1))
+        return grams
+
+    def add(self, record: CommandRecord) -> None:
+        doc_id = len(self.records)
+        fields = (
+            record.name.lower(),
+            " ".join(record.aliases).lower(),
+            (record.description or "").lower(),
+            record.plugin.lower(),
+        )
+        self.records.append(record)
+        self._fields.append(fields)
+        for text in fields:
+            for gram in self._grams(text):
+                self._postings[gram].add(doc_id)
+
+    def _query_grams(self, keyword: str) -> Set[str]:
+        if len(keyword) <= self.n:
+            return {keyword}
+        return {keyword[i : i + self.n] for i in range(len(keyword) - self.n + 1)}
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        record_filter: Optional[Callable[[CommandRecord], bool]] = None,
+    ) -> Tuple[List[CommandRecord], int]:
+        """返回 (按相关度排序的前 limit 条, 命中总数)；多个关键字之间为“且”的关系
+
+        record_filter 用于剔除调用者不可见的命令，不影响索引本身。
+        """
+        keywords = [k for k in query.lower().split() if k]
+        if not keywords:
+            return [], 0
+        candidates: Set[int] | None = None
+        for keyword in keywords:
+            postings = sorted(
+                (
+                    self._postings.get(gram, set())
+                    for gram in self._query_grams(keyword)
+                ),
+                key=len,
+            )
+            for posting in postings:
+                candidates = (
+                    set(posting) if candidates is None else candidates & posting
+                )
+                if not candidates:
+                    return [], 0
+
+        scored = []
+        for doc_id in candidates or ():
+            if record_filter is not None and not record_filter(self.records[doc_id]):
+                continue
+            fields = self._fields[doc_id]
+            score = 0
+            for keyword in keywords:
+                matched = [
+                    weight
+                    for (_, weight), text in zip(self.FIELD_WEIGHTS, fields)
+                    if keyword in text
+                ]
+                if not matched:
+                    break
+                score += max(matched)
+            else:
+                # 命令名完全相同的排在最前
+                if fields[0].lstrip("/") in (k.lstrip("/") for k in keywords):
+                    score += 100
+                scored.append((-score, doc_id))
+        scored.sort()
+        return [self.records[doc_id] for _, doc_id in scored[:limit]], len(scored)
@@ -0,0 +1,84 @@
+import collections
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# 缓存键：(文本, 字体文件, 字号)
+TextRunKey = Tuple[str, str, int]
+# 缓存值：(L 模式的字形蒙版, 相对绘制坐标的偏移)
+TextRun = Tuple[Image.Image, Tuple[int, int]]
+
+
+class TextRunCache:
+    """已光栅化文本的 LRU 缓存
+
+    缓存的是与颜色无关的 L 蒙版，绘制时用 ``Image.paste(fill, box, mask)`` 着色，
+    与 ``ImageDraw.text`` 内部的混合方式相同，因此输出逐像素一致。
+    """
+
+    def __init__(self, max_items: int = 4096) -> None:
+        self.max_items = max(0, max_items)
+        self.hits = 0
+        self.misses = 0
+        self._runs: collections.OrderedDict[TextRunKey, TextRun] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _rasterize(text: str, font: ImageFont.FreeTypeFont) -> Optional[TextRun]:
+        left, top, right, bottom = font.getbbox(text)
+        if right <= left or bottom <= top:
+            return None
+        mask = Image.new("L", (right - left, bottom - top), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+        return mask, (left, top)
+
+    def get(self, text: str, font: ImageFont.FreeTypeFont) -> Optional[TextRun]:
+        key = (text, font.path, font.size)
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None:
+                self._runs.move_to_end(key)
+                self.hits += 1
+                return run
+            self.misses += 1
+        run = self._rasterize(text, font)
+        if run is not None and self.max_items:
+            with self._lock:
+                self._runs[key] = run
+                while len(self._runs) > self.max_items:
+                    self._runs.popitem(last=False)
+        return run
+
+    def draw(
+        self,
+        img: Image.Image,
+        xy: Tuple[int, int],
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        fill: Tuple[int, int, int],
+    ) -> None:
+        """在 img 的 xy 处绘制文本，效果等同于 ImageDraw.text"""
+        if not text:
+            return
+        run = self.get(text, font)
+        if run is None:
+            return
+        mask, (dx, dy) = run
+        x, y = int(xy[0]) + dx, int(xy[1]) + dy
+        img.paste(fill, (x, y, x + mask.width, y + mask.height), mask)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._runs),
+                "max_size": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._runs.clear()
@@ -0,0 +1,95 @@
+from typing import Dict, Iterable, List, Optional
+
+from .draw import Section
+
+
+class TextHelpRenderer:
+    """把解析好的分区渲染为纯文本或 Markdown，不经过 Pillow
+
+    适用于发图慢或受限的平台；输出按 chunk_size 切分为多条消息，
+    尽量在分区、行的边界处断开。
+    """
+
+    MODES = ("image", "text", "markdown")
+
+    def __init__(self, chunk_size: int = 1800) -> None:
+        self.chunk_size = max(100, chunk_size)
+
+    @staticmethod
+    def resolve_mode(
+        default: str, platform_modes: Iterable[str], platform: Optional[str]
+    ) -> str:
+        """根据 “平台名:模式” 形式的配置确定当前平台的输出模式"""
+        mode = default if default in TextHelpRenderer.MODES else "image"
+        if not platform:
+            return mode
+        overrides: Dict[str, str] = {}
+        for item in platform_modes or []:
+            name, sep, value = str(item).partition(":")
+            if sep and value.strip() in TextHelpRenderer.MODES:
+                overrides[name.strip()] = value.strip()
+        return overrides.get(platform, mode)
+
+    def render(
+        self,
+        sections: List[Section],
+        markdown: bool = False,
+        title: str = "",
+        footer: str = "",
+    ) -> List[str]:
+        """返回切分好的消息列表"""
+        blocks = []
+        if title:
+            blocks.append(f"# {title}" if markdown else f"== {title} ==")
+        for name, cmds in sections:
+            if markdown:
+                lines = [f"## {name}"]
+                for cmd, desc in cmds:
+                    lines.append(f"- `{cmd}` {desc}" if desc else f"- `{cmd}`")
+            else:
+                lines = [f"【{name}】"]
+                for cmd, desc in cmds:
+                    lines.append(f"  {cmd}  {desc}" if desc else f"  {cmd}")
+            blocks.append("\n".join(lines))
+        if footer:
+            blocks.append(f"*{footer}*" if markdown else footer)
+        return self._chunk(blocks)
+
+    def _chunk(self, blocks: List[str]) -> List[str]:
+        """按块（分区）拼接；单个块过长时再按行切分，单行过长时硬切"""
+        chunks: List[str] = []
+        current = ""
+        for block in blocks:
+            for piece in self._split_block(block):
+                candidate = f"{current}\n\n{piece}" if current else piece
+                if len(candidate) <= self.chunk_size:
+                    current = candidate
+                    continue
+                if current:
+                    chunks.append(current)
+                current = piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _split_block(self, block: str) -> List[str]:
+        if len(block) <= self.chunk_size:
+            return [block]
+        pieces: List[str] = []
+        current = ""
+        for line in block.split("\n"):
+            while len(line) > self.chunk_size:
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(line[: self.chunk_size])
+                line = line[self.chunk_size :]
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) <= self.chunk_size:
+                current = candidate
+            else:
+                pieces.append(current)
+                current = line
+        if current:
+            pieces.append(current)
+        return pieces
@@ -0,0 +1,118 @@
+import re
+from typing import Dict, List, Tuple
+
+from PIL import ImageFont
+
+# 不能出现在行首的标点（避头），遇到时挂在上一行行尾
+NO_LINE_START = set("，。、；：？！）】》」』”’〉…—～,.;:?!)]}%")
+# 不能出现在行尾的标点（避尾），遇到时连同后一个字符一起换行
+NO_LINE_END = set("（【《「『“‘〈([{")
+
+# 中日韩文字及全角符号，彼此之间可以任意断行
+_CJK_RANGES = (
+    (0x1100, 0x11FF),
+    (0x2E80, 0x303F),
+    (0x3040, 0x30FF),
+    (0x3100, 0x31FF),
+    (0x3200, 0x9FFF),
+    (0xAC00, 0xD7AF),
+    (0xF900, 0xFAFF),
+    (0xFE30, 0xFE4F),
+    (0xFF00, 0xFFEF),
+    (0x20000, 0x2FA1F),
+)
+
+# 拆分为：连续空白 / 单个 CJK 字符 / 连续的非 CJK 单词
+_TOKEN_RE = re.compile(
+    r"\s+|["
+    + "".join(f"\\U{lo:08x}-\\U{hi:08x}" for lo, hi in _CJK_RANGES)
+    + r"]|[^\s"
+    + "".join(f"\\U{lo:08x}-\\U{hi:08x}" for lo, hi in _CJK_RANGES)
+    + r"]+"
+)
+
+
+class PixelTextWrapper:
+    """按渲染像素宽度换行
+
+    每个字体的字符步进宽度只向 FreeType 查询一次，之后每行的宽度计算
+    只是逐字符查表累加。
+    """
+
+    def __init__(self) -> None:
+        # (字体文件, 字号) -> {字符: 步进宽度}
+        self._advances: Dict[Tuple[str, int], Dict[str, float]] = {}
+
+    def _advance_table(self, font: ImageFont.FreeTypeFont) -> Dict[str, float]:
+        key = (font.path, font.size)
+        table = self._advances.get(key)
+        if table is None:
+            table = self._advances[key] = {}
+        return table
+
+    def text_width(self, text: str, font: ImageFont.FreeTypeFont) -> float:
+        table = self._advance_table(font)
+        width = 0.0
+        for ch in text:
+            advance = table.get(ch)
+            if advance is None:
+                advance = table[ch] = font.getlength(ch)
+            width += advance
+        return width
+
+    def wrap(
+        self, text: str, font: ImageFont.FreeTypeFont, max_width: float
+    ) -> List[str]:
+        """把 text 按 max_width 像素换行，返回各行文本"""
+        if not text or not text.strip():
+            return []
+        lines: List[str] = []
+        line = ""
+        line_width = 0.0
+        space_width = self.text_width(" ", font)
+
+        def flush() -> None:
+            nonlocal line, line_width
+            stripped = line.rstrip()
+            if stripped:
+                lines.append(stripped)
+            line, line_width = "", 0.0
+
+        for token in _TOKEN_RE.findall(text):
+            if token.isspace():
+                # 行首空白丢弃，其余空白折叠成一个空格
+                if line and not line.endswith(" "):
+                    line += " "
+                    line_width += space_width
+                continue
+            token_width = self.text_width(token, font)
+            if line_width + token_width <= max_width:
+                line += token
+                line_width += token_width
+                continue
+            # 避头：标点挂在当前行尾，允许略微超出
+            if token in NO_LINE_START and line.strip():
+                line += token
+                line_width += token_width
+                continue
+            # 避尾：把行尾的开括号等带到下一行
+            carry = ""
+            while line and line[-1] in NO_LINE_END:
+                carry = line[-1] + carry
+                line = line[:-1]
+            flush()
+            line = carry
+            line_width = self.text_width(carry, font)
+            if line_width + token_width <= max_width:
+                line += token
+                line_width += token_width
+                continue
+            # 单个单词比整行还宽，只能按字符硬断
+            for ch in token:
+                ch_width = self.text_width(ch, font)
+                if line and line_width + ch_width > max_width:
+                    flush()
+                line += ch
+                line_width += ch_width
+        flush()
+        return lines